@@ -0,0 +1,63 @@
+import argparse
+import time
+from typing import Callable
+import torch
+from torch.profiler import ProfilerActivity, profile
+from dataset import cached_dataset
+from neural_bigram_model import NeuralBigramModel
+from optimizer import SGD
+from tokenizer import Tokenizer
+
+# one training step of main_nn.py: loss, backward and update
+Step = Callable[[], torch.Tensor]
+
+def make_step(model: NeuralBigramModel, loss_fn: Callable, xs: torch.Tensor, ys: torch.Tensor) -> Step:
+    optimizer = SGD(model.parameters)
+    def step():
+        loss = loss_fn(xs, ys, reg_strength=0.01)
+        optimizer.zero_grad()
+        model.backward(loss)
+        optimizer.step(50)
+        return loss
+    return step
+
+def time_step(step: Step, steps: int) -> float:
+    best = float('inf')
+    for _ in range(steps):
+        start = time.perf_counter()
+        step()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def allocated_bytes(step: Step) -> int:
+    # total bytes allocated by the cpu ops of one step
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        step()
+    return sum(max(e.self_cpu_memory_usage, 0) for e in prof.events() or [])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark a NeuralBigramModel training step')
+    parser.add_argument('--steps', type=int, default=50)
+    args = parser.parse_args()
+
+    words = open('./names.txt').read().splitlines()
+    tokenizer = Tokenizer(vocabulary=Tokenizer.compute_vocabulary(words), start_token='.')
+    X, ys = cached_dataset('./names.txt', tokenizer, context_size=1).tensors()
+    xs = X[:, 0]
+
+    results = {}
+    for name in ['reference', 'gather']:
+        model = NeuralBigramModel(tokenizer, generator=torch.Generator().manual_seed(2147483647))
+        loss_fn = model.compute_loss if name == 'gather' else model.compute_loss_reference
+        step = make_step(model, loss_fn, xs, ys)
+        loss = step().item()
+        results[name] = (time_step(step, args.steps), allocated_bytes(step), loss)
+
+    print(f'{"path":<12}{"ms/step":>10}{"MB/step":>10}{"first loss":>14}')
+    for name, (seconds, nbytes, loss) in results.items():
+        print(f'{name:<12}{seconds * 1e3:>10.2f}{nbytes / 2**20:>10.1f}{loss:>14.6f}')
+    ref, new = results['reference'], results['gather']
+    print(f'speedup {ref[0] / new[0]:.1f}x, memory {ref[1] / max(new[1], 1):.1f}x less')
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 from typing import Optional
 import torch
+from sampling import generate_batch
 from tokenizer import Tokenizer
 
 class BigramModel:
@@ -10,24 +11,79 @@ class BigramModel:
             dtype=torch.int32
         )
         self.P: Optional[torch.Tensor] = None
+        # per row alias tables (see _build_alias_tables), set by training
+        self._alias_prob: Optional[torch.Tensor] = None
+        self._alias: Optional[torch.Tensor] = None
+        self._alias_rows: list[tuple[list[float], list[int]]] = []
 
     def train(self, words: list[str], smoothing: int = 0) -> None:
+        xs, ys = self.create_dataset(words)
+        if len(xs) == 0:
+            return
+        # count every bigram at once by flattening (enc1, enc2) into one index
+        V = self.tokenizer.vocab_size
+        counts = torch.bincount(xs * V + ys, minlength=V * V)
+        self.N += counts.view(V, V).to(self.N.dtype)
+        self._compute_probs(smoothing)
+
+    def train_reference(self, words: list[str], smoothing: int = 0) -> None:
+        # python loop version of train, kept to check the vectorized one against
         for word in words:
             tokens = self.tokenizer.tokenize(word)
             encodings = self.tokenizer.encode(tokens)
             for enc1, enc2 in zip(encodings, encodings[1:]):
                 self.N[enc1, enc2] += 1
+        self._compute_probs(smoothing)
+
+    def _compute_probs(self, smoothing: int) -> None:
         P = (self.N + smoothing).float()
         P /= P.sum(dim=1, keepdim=True)
         self.P = P
+        self._build_alias_tables()
+
+    def _build_alias_tables(self) -> None:
+        # Vose's alias method: column k of a row is drawn with probability
+        # _alias_prob[row, k], otherwise _alias[row, k] is. Picking a column
+        # uniformly then makes every draw O(1) however large the vocabulary
+        assert self.P is not None
+        V = self.tokenizer.vocab_size
+        prob = torch.ones((V, V), dtype=torch.float64)
+        alias = torch.arange(V).repeat(V, 1)
+        for row, p in enumerate(self.P.double().tolist()):
+            scaled = [pi * V for pi in p]
+            small = [k for k, s in enumerate(scaled) if s < 1.0]
+            large = [k for k, s in enumerate(scaled) if s >= 1.0]
+            while small and large:
+                s, l = small.pop(), large.pop()
+                prob[row, s] = scaled[s]
+                alias[row, s] = l
+                scaled[l] -= 1.0 - scaled[s]
+                (small if scaled[l] < 1.0 else large).append(l)
+            # leftovers are 1 up to rounding and keep prob 1
+        self._alias_prob = prob
+        self._alias = alias
+        self._alias_rows = list(zip(prob.tolist(), alias.tolist()))
+
+    def _sample(self, encs: torch.Tensor, generator: torch.Generator) -> torch.Tensor:
+        # one uniform per draw: its integer part picks the column, the
+        # fractional part decides between the column and its alias
+        assert self._alias_prob is not None and self._alias is not None
+        V = self.tokenizer.vocab_size
+        u = torch.rand(encs.shape, dtype=torch.float64, generator=generator) * V
+        k = u.long().clamp_(max=V - 1)
+        keep = (u - k) < self._alias_prob[encs, k]
+        return torch.where(keep, k, self._alias[encs, k])
 
     def sample_next(self, token: str, generator: torch.Generator) -> str:
         if self.P is None:
             raise RuntimeError('Model must be trained before sampling')
-        enc = self.tokenizer.encode(token)
-        p = self.P[enc]
-        enc = torch.multinomial(p, num_samples=1, replacement=False, generator=generator).item()
-        next_token = self.tokenizer.decode(int(enc))
+        # scalar version of _sample on python lists, avoids tensor op overhead
+        prob, alias = self._alias_rows[self.tokenizer.encode(token)]
+        V = self.tokenizer.vocab_size
+        u = torch.rand(1, dtype=torch.float64, generator=generator).item() * V
+        k = min(int(u), V - 1)
+        enc = k if u - k < prob[k] else alias[k]
+        next_token = self.tokenizer.decode(enc)
         return next_token
 
     def generate(self, generator: torch.Generator) -> str:
@@ -39,7 +95,20 @@ class BigramModel:
                 break
         return self.tokenizer.untokenize(tokens)
 
+    def generate_batch(self, n: int, generator: torch.Generator, max_len: Optional[int] = 100) -> list[str]:
+        if self.P is None:
+            raise RuntimeError('Model must be trained before sampling')
+        return generate_batch(self.tokenizer, n, 1, lambda X: self._sample(X[:, -1], generator), max_len)
+
     def eval(self, words: list[str]) -> float:
+        if self.P is None:
+            raise RuntimeError('Model must be trained before eval')
+        xs, ys = self.create_dataset(words)
+        nll = -self.P[xs, ys].double().log().mean()
+        return nll.item()
+
+    def eval_reference(self, words: list[str]) -> float:
+        # python loop version of eval, kept to check the vectorized one against
         if self.P is None:
             raise RuntimeError('Model must be trained before eval')
         n = 0
@@ -50,4 +119,7 @@ class BigramModel:
             for enc1, enc2 in zip(encodings, encodings[1:]):
                 n += 1
                 log_likelihood += torch.log(self.P[enc1, enc2])
-        return - log_likelihood / n
+        return float(- log_likelihood / n)
+
+    def create_dataset(self, words: list[str]) -> tuple[torch.Tensor, torch.Tensor]:
+        return self.tokenizer.encode_pairs(words)
@@ -0,0 +1,78 @@
+import os
+import torch
+from lr_scheduler import LearningRateScheduler
+from mlp_model import MlpModel
+from optimizer import Optimizer
+
+# bump when the layout of checkpoints changes
+CHECKPOINT_VERSION = 2
+
+def save_checkpoint(
+    path: str,
+    model: MlpModel,
+    optimizer: Optimizer,
+    scheduler: LearningRateScheduler,
+    generators: dict[str, torch.Generator],
+    hparams: dict[str, object]
+) -> None:
+    # everything a training loop needs to carry on exactly where it stopped:
+    # parameters, optimizer buffers, schedule position and every rng state,
+    # including the global one used by torch.randint without a generator.
+    # hparams holds the loop's own settings (batch size...), which are checked
+    # on load along with the model, optimizer and schedule configs
+    checkpoint = {
+        'version': CHECKPOINT_VERSION,
+        'config': _configs(model, optimizer, scheduler, hparams),
+        'model': model.state_dict(),
+        'optimizer': optimizer.state_dict(),
+        'scheduler': scheduler.state_dict(),
+        'rng': {
+            'torch': torch.get_rng_state(),
+            **{ name: g.get_state() for name, g in generators.items() }
+        }
+    }
+    # written next to the target and renamed over it, so a run killed halfway
+    # through a save still leaves the previous checkpoint intact
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        torch.save(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_checkpoint(
+    path: str,
+    model: MlpModel,
+    optimizer: Optimizer,
+    scheduler: LearningRateScheduler,
+    generators: dict[str, torch.Generator],
+    hparams: dict[str, object]
+) -> None:
+    checkpoint = torch.load(path)
+    if checkpoint['version'] != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} has checkpoint version {checkpoint['version']}, expected {CHECKPOINT_VERSION}")
+    # resuming into a different setup would silently train something else
+    configs = _configs(model, optimizer, scheduler, hparams)
+    for name, config in configs.items():
+        if checkpoint['config'][name] != config:
+            raise ValueError(f"{path} was saved with {name} {checkpoint['config'][name]}, not {config}")
+    model.load_state_dict(checkpoint['model'])
+    optimizer.load_state_dict(checkpoint['optimizer'])
+    scheduler.load_state_dict(checkpoint['scheduler'])
+    torch.set_rng_state(checkpoint['rng']['torch'])
+    for name, g in generators.items():
+        g.set_state(checkpoint['rng'][name])
+
+def _configs(
+    model: MlpModel,
+    optimizer: Optimizer,
+    scheduler: LearningRateScheduler,
+    hparams: dict[str, object]
+) -> dict[str, object]:
+    return {
+        'model': model.config(),
+        'optimizer': optimizer.config(),
+        'schedule': scheduler.config(),
+        'hparams': hparams
+    }
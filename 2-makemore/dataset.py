@@ -0,0 +1,136 @@
+import hashlib
+import itertools
+import json
+import os
+from typing import Iterator
+import torch
+from tokenizer import Tokenizer
+
+# bump when the layout of cached files changes
+CACHE_VERSION = 1
+
+class ContextDataset:
+    def __init__(
+        self,
+        stream: torch.Tensor,
+        targets: torch.Tensor,
+        offsets: torch.Tensor,
+        context_size: int
+    ) -> None:
+        # stream is the padded corpus from Tokenizer.encode_corpus, targets the
+        # positions in it that are predicted and offsets where each word starts
+        self.stream = stream
+        self.targets = targets
+        self.offsets = offsets
+        self.context_size = context_size
+        # row i is a view of stream[i:i+context_size], nothing is copied. An
+        # empty corpus is shorter than one window, so it gets no rows
+        if len(stream) < context_size:
+            self.windows = stream.new_empty((0, context_size))
+        else:
+            self.windows = stream.unfold(0, context_size, 1)
+
+    @staticmethod
+    def from_words(words: list[str], tokenizer: Tokenizer, context_size: int) -> 'ContextDataset':
+        dtype = torch.uint8 if tokenizer.vocab_size <= 256 else torch.int32
+        stream, offsets = tokenizer.encode_corpus(words, with_start=context_size, dtype=dtype)
+        # every position except each word's leading padding is a target
+        is_target = torch.ones(len(stream), dtype=torch.bool)
+        is_target[(offsets[:-1, None] + torch.arange(context_size)).flatten()] = False
+        targets = is_target.nonzero().squeeze(1).to(torch.int32)
+        return ContextDataset(stream, targets, offsets, context_size)
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def batch(self, idxs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+        # gathers just the requested examples: contexts and the token after them
+        positions = self.targets[idxs].long()
+        X = self.windows[positions - self.context_size].long()
+        Y = self.stream[positions].long()
+        return X, Y
+
+    def tensors(self) -> tuple[torch.Tensor, torch.Tensor]:
+        return self.batch(torch.arange(len(self)))
+
+    def chunks(self, chunk_size: int) -> Iterator[tuple[torch.Tensor, torch.Tensor]]:
+        # the whole dataset in order, at most chunk_size examples at a time
+        for start in range(0, len(self), chunk_size):
+            yield self.batch(torch.arange(start, min(start + chunk_size, len(self))))
+
+    def split(
+        self,
+        fractions: list[float],
+        seed: int = 42
+    ) -> list['ContextDataset']:
+        # partitions the words (not the examples) at random, so no word has
+        # contexts in two splits. The same seed always gives the same splits,
+        # and every split is a view over the same stream
+        assert abs(sum(fractions) - 1.0) < 1e-6, 'fractions should sum to 1'
+        n_words = len(self.offsets) - 1
+        perm = torch.randperm(n_words, generator=torch.Generator().manual_seed(seed))
+        word_split = torch.empty(n_words, dtype=torch.long)
+        cuts = [round(b * n_words) for b in itertools.accumulate(fractions, initial=0.0)]
+        for i, (lo, hi) in enumerate(zip(cuts, cuts[1:])):
+            word_split[perm[lo:hi]] = i
+        # word of every target: the last offset at or before its position
+        words = torch.searchsorted(self.offsets, self.targets.long(), right=True) - 1
+        target_split = word_split[words]
+        return [
+            ContextDataset(self.stream, self.targets[target_split == i], self.offsets, self.context_size)
+            for i in range(len(fractions))
+        ]
+
+def cached_dataset(
+    corpus_path: str,
+    tokenizer: Tokenizer,
+    context_size: int,
+    cache_dir: str = './.cache'
+) -> ContextDataset:
+    # the encoded tensors are stored as raw files named after a hash of
+    # everything that determines them, and memory-mapped back on later runs.
+    # The maps are private, so processes using the same dataset share pages
+    with open(corpus_path, 'rb') as f:
+        corpus = f.read()
+    key = hashlib.sha256()
+    key.update(hashlib.sha256(corpus).digest())
+    key.update(json.dumps([
+        CACHE_VERSION,
+        tokenizer.vocabulary,
+        tokenizer.start_token,
+        tokenizer.end_token,
+        context_size,
+    ]).encode())
+    prefix = os.path.join(cache_dir, key.hexdigest()[:32])
+
+    # the metadata is written last, so its presence means the entry is complete
+    if not os.path.exists(prefix + '.json'):
+        words = corpus.decode().splitlines()
+        dataset = ContextDataset.from_words(words, tokenizer, context_size)
+        os.makedirs(cache_dir, exist_ok=True)
+        meta = {}
+        for name in ['stream', 'targets', 'offsets']:
+            tensor: torch.Tensor = getattr(dataset, name)
+            _write_atomic(f'{prefix}.{name}', tensor.numpy().tobytes())
+            meta[name] = { 'size': len(tensor), 'dtype': str(tensor.dtype) }
+        _write_atomic(prefix + '.json', json.dumps(meta).encode())
+        return dataset
+
+    with open(prefix + '.json') as f:
+        meta = json.load(f)
+    tensors = {
+        name: torch.from_file(
+            f'{prefix}.{name}',
+            shared=False,
+            size=info['size'],
+            dtype=getattr(torch, info['dtype'].removeprefix('torch.'))
+        )
+        for name, info in meta.items()
+    }
+    return ContextDataset(tensors['stream'], tensors['targets'], tensors['offsets'], context_size)
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
@@ -1,17 +1,119 @@
+from abc import ABC, abstractmethod
+import bisect
+import math
+from typing import Union
+
+class Segment(ABC):
+    # learning rate for step t of a segment that lasts length steps
+    @abstractmethod
+    def __call__(self, t: int, length: int) -> float:
+        ...
+
+class Constant(Segment):
+    def __init__(self, lr: float) -> None:
+        self.lr = lr
+
+    def __call__(self, t: int, length: int) -> float:
+        return self.lr
+
+class Linear(Segment):
+    # from start on the first step to end on the last one
+    def __init__(self, start: float, end: float) -> None:
+        self.start = start
+        self.end = end
+
+    def __call__(self, t: int, length: int) -> float:
+        frac = t / (length - 1) if length > 1 else 1.0
+        return self.start + (self.end - self.start) * frac
+
+class Warmup(Segment):
+    # ramps up linearly and reaches lr on the last step, never returns 0
+    def __init__(self, lr: float) -> None:
+        self.lr = lr
+
+    def __call__(self, t: int, length: int) -> float:
+        return self.lr * (t + 1) / length
+
+class Cosine(Segment):
+    # half a cosine from start to end over the segment
+    def __init__(self, start: float, end: float = 0.0) -> None:
+        self.start = start
+        self.end = end
+
+    def __call__(self, t: int, length: int) -> float:
+        frac = t / (length - 1) if length > 1 else 1.0
+        return self.end + (self.start - self.end) * (1 + math.cos(math.pi * frac)) / 2
+
+class Exponential(Segment):
+    # start * gamma^t
+    def __init__(self, start: float, gamma: float) -> None:
+        self.start = start
+        self.gamma = gamma
+
+    def __call__(self, t: int, length: int) -> float:
+        return self.start * self.gamma ** t
+
+class StepDecay(Segment):
+    # start, multiplied by gamma every step_size steps
+    def __init__(self, start: float, gamma: float, step_size: int) -> None:
+        self.start = start
+        self.gamma = gamma
+        self.step_size = step_size
+
+    def __call__(self, t: int, length: int) -> float:
+        return self.start * self.gamma ** (t // self.step_size)
+
 class LearningRateScheduler:
-    def __init__(self, schedule: list[tuple[int, float]]) -> None:
+    def __init__(self, schedule: list[tuple[int, Union[float, Segment]]]) -> None:
+        # only the segment boundaries are stored, rates are computed on demand
         self._epoch = 0
-        self._lrs: list[float] = []
+        self._segments: list[Segment] = []
+        self._lengths: list[int] = []
+        self._ends: list[int] = []
+        end = 0
         for epochs, lr in schedule:
-            self._lrs.extend([lr] * epochs)
+            if epochs <= 0:
+                continue
+            end += epochs
+            self._segments.append(lr if isinstance(lr, Segment) else Constant(lr))
+            self._lengths.append(epochs)
+            self._ends.append(end)
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def lr_at(self, epoch: int) -> float:
+        if not 0 <= epoch < len(self):
+            raise IndexError(f'epoch {epoch} is outside the schedule')
+        i = bisect.bisect_right(self._ends, epoch)
+        start = self._ends[i] - self._lengths[i]
+        return self._segments[i](epoch - start, self._lengths[i])
+
+    def config(self) -> list[list]:
+        # every segment as [epochs, kind, parameters], enough to tell whether
+        # a saved position belongs to this schedule
+        return [
+            [length, type(segment).__name__, dict(vars(segment))]
+            for length, segment in zip(self._lengths, self._segments)
+        ]
+
+    def seek(self, epoch: int) -> None:
+        # the next epoch returned will be this one
+        self._epoch = epoch
+
+    def state_dict(self) -> dict[str, int]:
+        return { 'epoch': self._epoch }
+
+    def load_state_dict(self, state_dict: dict[str, int]) -> None:
+        self.seek(state_dict['epoch'])
 
     def __iter__(self):
         return self
 
     def __next__(self) -> tuple[int, float]:
-        if self._epoch > len(self._lrs) - 1:
+        if self._epoch > len(self) - 1:
             raise StopIteration
         try:
-            return self._epoch, self._lrs[self._epoch]
+            return self._epoch, self.lr_at(self._epoch)
         finally:
             self._epoch += 1
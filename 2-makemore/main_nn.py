@@ -1,5 +1,7 @@
 import torch
+from dataset import cached_dataset
 from neural_bigram_model import NeuralBigramModel
+from optimizer import SGD
 from tokenizer import Tokenizer
 
 def init_gen():
@@ -23,15 +25,20 @@ def main():
 
     model = NeuralBigramModel(tokenizer, generator=g)
 
-    xs, ys = model.create_dataset(words)
+    # a context of one token is exactly the bigram dataset
+    X, ys = cached_dataset('./names.txt', tokenizer, context_size=1).tensors()
+    xs = X[:, 0]
     LR = 50
     REG_STRENGTH = 0.01
+    optimizer = SGD(model.parameters)
     # training loop
     for epoch in range(200):
         loss = model.compute_loss(xs, ys, reg_strength=REG_STRENGTH)
         if epoch % 10 == 0:
             print(loss.item())
-        model.backward(loss, lr=LR)
+        optimizer.zero_grad()
+        model.backward(loss)
+        optimizer.step(LR)
 
     # sample
     # reinitialise generator so its the same as BigramModel generations
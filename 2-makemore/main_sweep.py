@@ -0,0 +1,22 @@
+from sweep import Sweep, grid
+
+def main():
+    SEARCH_SPACE = {
+        'context_size': [3, 5],
+        'embedding_dim': [2, 10],
+        'hidden_dim': [100, 200],
+        'batch_size': [32, 128],
+        'lr': [0.01, 0.003],
+        'schedule': ['step', 'cosine'],
+        'steps': [15000],
+    }
+    sweep = Sweep(list(grid(SEARCH_SPACE)))
+    print(f'{len(sweep.configs)} configs on {sweep.processes} processes, {sweep.threads} threads each')
+    rows = sweep.run('./sweep_results.csv')
+
+    print('Best configs:')
+    for row in rows[:5]:
+        print(row)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,8 @@
+from typing import Optional
 import torch
 import torch.nn.functional as F
+from dataset import ContextDataset
+from sampling import generate_batch
 from tokenizer import Tokenizer
 
 class MlpModel:
@@ -26,16 +29,28 @@ class MlpModel:
         self.W2 = torch.randn((hidden_dim, tokenizer.vocab_size), generator=generator)
         self.b2 = torch.randn(tokenizer.vocab_size, generator=generator)
         # Collect parameters
-        self.parameters = [
-            self.C,
-            self.W1,
-            self.b1,
-            self.W2,
-            self.b2
-        ]
+        self._parameter_names = ['C', 'W1', 'b1', 'W2', 'b2']
+        self.parameters: list[torch.Tensor] = [getattr(self, name) for name in self._parameter_names]
         for p in self.parameters:
             p.requires_grad = True
 
+    def config(self) -> dict[str, int]:
+        # constructor arguments that rebuild this architecture
+        return {
+            'context_size': self.context_size,
+            'embedding_dim': self.embedding_dim,
+            'hidden_dim': self.hidden_dim
+        }
+
+    def state_dict(self) -> dict[str, torch.Tensor]:
+        return { name: getattr(self, name) for name in self._parameter_names }
+
+    def load_state_dict(self, state_dict: dict[str, torch.Tensor]) -> None:
+        # copies into the existing tensors, so optimizers keep working on them
+        with torch.no_grad():
+            for name in self._parameter_names:
+                getattr(self, name).copy_(state_dict[name])
+
     def forward(self, X: torch.Tensor) -> torch.Tensor:
         embs = self.C[X]
         embs_view = embs.view(-1, self.context_size * self.embedding_dim)
@@ -43,16 +58,9 @@ class MlpModel:
         logits = h @ self.W2 + self.b2
         return logits
 
-    def backward(self, loss: torch.Tensor, lr: float) -> None:
-        ## Backward pass
-        # zero grad
-        for p in self.parameters:
-            p.grad = None
-        # backprop
+    def backward(self, loss: torch.Tensor) -> None:
+        # only computes grads, zeroing and updating is left to an Optimizer
         loss.backward()
-        # update
-        for p in self.parameters:
-            p.data += -lr * p.grad # type: ignore
 
     def generate(self, generator: torch.Generator) -> str:
         encs = self.tokenizer.encode([self.tokenizer.start_token] * self.context_size)
@@ -68,26 +76,25 @@ class MlpModel:
         tokens = self.tokenizer.decode(encs)
         return self.tokenizer.untokenize(tokens)
 
+    def generate_batch(self, n: int, generator: torch.Generator, max_len: Optional[int] = 100) -> list[str]:
+        def sample_next(X: torch.Tensor) -> torch.Tensor:
+            probs = F.softmax(self.forward(X), dim=1)
+            return torch.multinomial(probs, num_samples=1, replacement=False, generator=generator).squeeze(1)
+        return generate_batch(self.tokenizer, n, self.context_size, sample_next, max_len)
+
     def eval(self, words: list[str]) -> float:
-        X, Y = self.create_dataset(words)
-        logits = self.forward(X)
-        loss = F.cross_entropy(logits, Y, reduction='mean')
-        return loss.item()
+        return self.eval_dataset(self.create_dataset(words))
+
+    def eval_dataset(self, dataset: ContextDataset, chunk_size: int = 8192) -> float:
+        # mean loss over the dataset without building a graph, and with at
+        # most chunk_size x vocab_size logits alive at any time
+        if len(dataset) == 0:
+            raise ValueError('cannot evaluate on an empty dataset')
+        total = 0.0
+        with torch.inference_mode():
+            for X, Y in dataset.chunks(chunk_size):
+                total += F.cross_entropy(self.forward(X), Y, reduction='sum').item()
+        return total / len(dataset)
 
-    def create_dataset(self, words: list[str]) -> tuple[torch.Tensor, torch.Tensor]:
-        xs: list[list[int]] = []
-        ys: list[int] = []
-        for word in words:
-            tokens = self.tokenizer.tokenize(word, with_start=self.context_size)
-            encodings = self.tokenizer.encode(tokens)
-            for idx in range(len(encodings) - self.context_size):
-                # print(
-                #     ''.join(tokens[idx:idx+self.context_size]),
-                #     '---->',
-                #     tokens[idx+self.context_size]
-                # )
-                encs_in = encodings[idx:idx+self.context_size]
-                enc_out = encodings[idx+self.context_size]
-                xs.append(encs_in)
-                ys.append(enc_out)
-        return torch.tensor(xs), torch.tensor(ys)
+    def create_dataset(self, words: list[str]) -> ContextDataset:
+        return ContextDataset.from_words(words, self.tokenizer, self.context_size)
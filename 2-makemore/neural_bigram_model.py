@@ -1,5 +1,7 @@
+from typing import Optional
 import torch
 import torch.nn.functional as F
+from sampling import generate_batch
 from tokenizer import Tokenizer
 
 class NeuralBigramModel:
@@ -14,6 +16,7 @@ class NeuralBigramModel:
             requires_grad=True,
             generator=generator
         )
+        self.parameters = [self.W]
 
     def compute_loss(
         self,
@@ -21,24 +24,36 @@ class NeuralBigramModel:
         ys: torch.Tensor,
         reg_strength: float,
     ) -> torch.Tensor:
-        probs = self.compute_probs(xs)
+        # one-hot @ W just selects rows of W, so gather them directly and let
+        # cross_entropy do a stable log-softmax and the nll in one go
+        logits = self.W[xs]
         ## loss calc
         # regularization: penalize large weights
         reg_term = reg_strength * (self.W ** 2).mean()
-        loss = -probs[torch.arange(xs.nelement()), ys].log().mean() + reg_term
+        loss = F.cross_entropy(logits, ys) + reg_term
         return loss
 
-    def compute_probs(self, xs: torch.Tensor) -> torch.Tensor:
+    def compute_loss_reference(
+        self,
+        xs: torch.Tensor,
+        ys: torch.Tensor,
+        reg_strength: float,
+    ) -> torch.Tensor:
+        # one-hot version of compute_loss, kept to check and benchmark against
         xenc: torch.Tensor = F.one_hot(xs, num_classes=self.tokenizer.vocab_size).float()
         logits = xenc @ self.W
         counts = logits.exp()
         probs = counts / counts.sum(1, keepdim=True)
-        return probs
+        reg_term = reg_strength * (self.W ** 2).mean()
+        loss = -probs[torch.arange(xs.nelement()), ys].log().mean() + reg_term
+        return loss
 
-    def backward(self, loss: torch.Tensor, lr: float) -> None:
-        self.W.grad = None
+    def compute_probs(self, xs: torch.Tensor) -> torch.Tensor:
+        return F.softmax(self.W[xs], dim=1)
+
+    def backward(self, loss: torch.Tensor) -> None:
+        # only computes grads, zeroing and updating is left to an Optimizer
         loss.backward()
-        self.W.data += -lr * self.W.grad # type: ignore
 
     def sample_next(self, token: str, generator: torch.Generator) -> str:
         enc = torch.tensor([self.tokenizer.encode(token)])
@@ -56,21 +71,17 @@ class NeuralBigramModel:
                 break
         return self.tokenizer.untokenize(tokens)
 
+    def generate_batch(self, n: int, generator: torch.Generator, max_len: Optional[int] = 100) -> list[str]:
+        def sample_next(X: torch.Tensor) -> torch.Tensor:
+            probs = self.compute_probs(X[:, -1])
+            return torch.multinomial(probs, num_samples=1, replacement=False, generator=generator).squeeze(1)
+        return generate_batch(self.tokenizer, n, 1, sample_next, max_len)
+
     def eval(self, words: list[str]) -> float:
         xs, ys = self.create_dataset(words)
-        probs = self.compute_probs(xs)
-        nll = -probs[torch.arange(xs.nelement()), ys].log().mean()
+        with torch.inference_mode():
+            nll = F.cross_entropy(self.W[xs], ys)
         return nll.item()
 
     def create_dataset(self, words: list[str]) -> tuple[torch.Tensor, torch.Tensor]:
-        xs: list[int] = []
-        ys: list[int] = []
-        for word in words:
-            tokens = self.tokenizer.tokenize(word)
-            encodings = self.tokenizer.encode(tokens)
-            for enc1, enc2, in zip(encodings, encodings[1:]):
-                xs.append(enc1)
-                ys.append(enc2)
-        # prefer use of torch.tensor over torch.Tensor, torch.tensor infers the dtype
-        # whereas torch.Tensor uses f32 unless otherwise specified
-        return torch.tensor(xs), torch.tensor(ys)
+        return self.tokenizer.encode_pairs(words)
@@ -0,0 +1,145 @@
+# torch._foreach_* are the multi-tensor kernels torch.optim itself uses, they
+# just aren't re-exported as public names
+# pyright: reportPrivateImportUsage=false
+from abc import ABC, abstractmethod
+import math
+from typing import Iterable
+import torch
+
+class Optimizer(ABC):
+    # Updates every parameter at once with torch._foreach_* kernels, which
+    # loop over the tensor lists in C++ rather than one python op per tensor.
+    # The learning rate is passed to each step so a scheduler can drive it
+    def __init__(self, params: Iterable[torch.Tensor], weight_decay: float = 0.0) -> None:
+        self.params = list(params)
+        self.weight_decay = weight_decay
+        self.steps = 0
+        # per parameter buffers, one list per kind of state
+        self.state: dict[str, list[torch.Tensor]] = {}
+
+    def zero_grad(self) -> None:
+        # zeroes grads in place, so backward accumulates into the same buffers
+        grads = [p.grad for p in self.params if p.grad is not None]
+        if grads:
+            torch._foreach_zero_(grads)
+
+    def _grads(self) -> list[torch.Tensor]:
+        grads: list[torch.Tensor] = []
+        for p in self.params:
+            if p.grad is None:
+                raise RuntimeError('step called before every parameter has a grad')
+            grads.append(p.grad)
+        return grads
+
+    @torch.no_grad()
+    def step(self, lr: float) -> None:
+        self.steps += 1
+        self._update(self._grads(), lr)
+
+    @abstractmethod
+    def _update(self, grads: list[torch.Tensor], lr: float) -> None:
+        ...
+
+    def _buffers(self, name: str) -> list[torch.Tensor]:
+        if name not in self.state:
+            self.state[name] = [torch.zeros_like(p) for p in self.params]
+        return self.state[name]
+
+    def config(self) -> dict[str, object]:
+        # the hyperparameters, to tell whether saved state fits this optimizer
+        return { 'class': type(self).__name__, 'weight_decay': self.weight_decay }
+
+    def state_dict(self) -> dict[str, object]:
+        return { 'steps': self.steps, 'state': self.state }
+
+    def load_state_dict(self, state_dict: dict[str, object]) -> None:
+        self.steps = int(state_dict['steps']) # type: ignore
+        state: dict[str, list[torch.Tensor]] = state_dict['state'] # type: ignore
+        self.state = {
+            name: [b.to(p.dtype).clone() for b, p in zip(buffers, self.params)]
+            for name, buffers in state.items()
+        }
+
+class SGD(Optimizer):
+    def __init__(
+        self,
+        params: Iterable[torch.Tensor],
+        momentum: float = 0.0,
+        weight_decay: float = 0.0
+    ) -> None:
+        super().__init__(params, weight_decay=weight_decay)
+        self.momentum = momentum
+
+    def config(self) -> dict[str, object]:
+        return { **super().config(), 'momentum': self.momentum }
+
+    def _update(self, grads: list[torch.Tensor], lr: float) -> None:
+        if self.weight_decay:
+            grads = list(torch._foreach_add(grads, self.params, alpha=self.weight_decay))
+        if self.momentum:
+            # same convention as torch.optim.SGD: buf = momentum * buf + grad,
+            # buffers start at zero so the first step gives buf = grad
+            bufs = self._buffers('momentum')
+            torch._foreach_mul_(bufs, self.momentum)
+            torch._foreach_add_(bufs, grads)
+            grads = bufs
+        torch._foreach_add_(self.params, grads, alpha=-lr)
+
+class Adam(Optimizer):
+    def __init__(
+        self,
+        params: Iterable[torch.Tensor],
+        betas: tuple[float, float] = (0.9, 0.999),
+        eps: float = 1e-8,
+        weight_decay: float = 0.0,
+        decoupled_weight_decay: bool = False
+    ) -> None:
+        super().__init__(params, weight_decay=weight_decay)
+        self.betas = betas
+        self.eps = eps
+        self.decoupled_weight_decay = decoupled_weight_decay
+
+    def config(self) -> dict[str, object]:
+        return {
+            **super().config(),
+            'betas': list(self.betas),
+            'eps': self.eps,
+            'decoupled_weight_decay': self.decoupled_weight_decay
+        }
+
+    def _update(self, grads: list[torch.Tensor], lr: float) -> None:
+        beta1, beta2 = self.betas
+        if self.weight_decay:
+            if self.decoupled_weight_decay:
+                torch._foreach_mul_(self.params, 1 - lr * self.weight_decay)
+            else:
+                grads = list(torch._foreach_add(grads, self.params, alpha=self.weight_decay))
+        exp_avg = self._buffers('exp_avg')
+        exp_avg_sq = self._buffers('exp_avg_sq')
+        torch._foreach_mul_(exp_avg, beta1)
+        torch._foreach_add_(exp_avg, grads, alpha=1 - beta1)
+        torch._foreach_mul_(exp_avg_sq, beta2)
+        torch._foreach_addcmul_(exp_avg_sq, grads, grads, value=1 - beta2)
+        # bias corrections folded into the denominator and the step size
+        bias_correction1 = 1 - beta1 ** self.steps
+        bias_correction2 = 1 - beta2 ** self.steps
+        denom = torch._foreach_sqrt(exp_avg_sq)
+        torch._foreach_div_(denom, math.sqrt(bias_correction2))
+        torch._foreach_add_(denom, self.eps)
+        torch._foreach_addcdiv_(self.params, exp_avg, denom, value=-lr / bias_correction1)
+
+class AdamW(Adam):
+    def __init__(
+        self,
+        params: Iterable[torch.Tensor],
+        betas: tuple[float, float] = (0.9, 0.999),
+        eps: float = 1e-8,
+        weight_decay: float = 0.01
+    ) -> None:
+        super().__init__(
+            params,
+            betas=betas,
+            eps=eps,
+            weight_decay=weight_decay,
+            decoupled_weight_decay=True
+        )
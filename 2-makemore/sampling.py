@@ -0,0 +1,35 @@
+from typing import Callable, Optional
+import torch
+from tokenizer import Tokenizer
+
+# draws the next encoding for every row of a (n, context_size) batch of
+# contexts, the last column holding the most recent encoding
+SampleNext = Callable[[torch.Tensor], torch.Tensor]
+
+def generate_batch(
+    tokenizer: Tokenizer,
+    n: int,
+    context_size: int,
+    sample_next: SampleNext,
+    max_len: Optional[int] = None
+) -> list[str]:
+    start = tokenizer.encode(tokenizer.start_token)
+    end = tokenizer.encode(tokenizer.end_token)
+    # all unfinished names advance together, finished ones are dropped. Names
+    # still running after max_len tokens are cut off there, so a model that
+    # rarely samples the end token (an untrained one...) still returns
+    active = torch.arange(n)
+    X = torch.full((n, context_size), start)
+    steps: list[tuple[list[int], list[int]]] = []
+    with torch.no_grad():
+        while active.numel() > 0 and (max_len is None or len(steps) < max_len):
+            encs = sample_next(X)
+            steps.append((active.tolist(), encs.tolist()))
+            running = encs != end
+            active = active[running]
+            X = torch.cat([X[running, 1:], encs[running, None]], dim=1)
+    tokens: list[list[str]] = [[] for _ in range(n)]
+    for idxs, step_encs in steps:
+        for i, enc in zip(idxs, step_encs):
+            tokens[i].append(tokenizer.decode(enc))
+    return [tokenizer.untokenize(t) for t in tokens]
@@ -0,0 +1,205 @@
+import csv
+import itertools
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+import traceback
+from typing import Any, Iterator, Optional
+import torch
+import torch.nn.functional as F
+from dataset import cached_dataset
+from lr_scheduler import Constant, Cosine, LearningRateScheduler, Segment, StepDecay
+from mlp_model import MlpModel
+from optimizer import Adam
+from tokenizer import Tokenizer
+
+Config = dict[str, Any]
+
+# keys a config can set, and their value when the search space leaves them out
+DEFAULTS: Config = {
+    'context_size': 3,
+    'embedding_dim': 2,
+    'hidden_dim': 100,
+    'batch_size': 32,
+    'lr': 0.01,
+    'schedule': 'constant',
+    'steps': 10000,
+}
+
+def _check_keys(keys) -> None:
+    # a typo would otherwise only surface after the config had been trained
+    unknown = sorted(set(keys) - set(DEFAULTS))
+    if unknown:
+        raise ValueError(f'unknown config keys {unknown}, expected some of {list(DEFAULTS)}')
+
+def grid(space: dict[str, list]) -> Iterator[Config]:
+    # every combination of the values in the search space
+    _check_keys(space)
+    keys = list(space)
+    for values in itertools.product(*(space[k] for k in keys)):
+        yield { **DEFAULTS, **dict(zip(keys, values)) }
+
+def sample(space: dict[str, list], n: int, seed: int = 0) -> Iterator[Config]:
+    # n random combinations, for spaces too big to search exhaustively
+    _check_keys(space)
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield { **DEFAULTS, **{ k: rng.choice(v) for k, v in space.items() } }
+
+def make_schedule(config: Config) -> LearningRateScheduler:
+    lr, steps = config['lr'], config['steps']
+    segment: Segment
+    if config['schedule'] == 'constant':
+        segment = Constant(lr)
+    elif config['schedule'] == 'cosine':
+        segment = Cosine(lr, lr / 100)
+    elif config['schedule'] == 'step':
+        # full rate for the first two thirds of the steps, then a tenth of it
+        segment = StepDecay(lr, 0.1, step_size=max(1, (2 * steps) // 3))
+    else:
+        raise ValueError(f"unknown schedule {config['schedule']!r}")
+    return LearningRateScheduler([(steps, segment)])
+
+# sweep settings every _run_config call in a worker needs. They come through
+# the pool's initargs, the shared best_dev array can't be pickled per task
+_corpus_path: Optional[str] = None
+_best_dev: Any = None
+_eval_every = 0
+_tolerance = 0.0
+_grace = 0.0
+
+def _init_worker(
+    threads: int,
+    corpus_path: str,
+    best_dev,
+    eval_every: int,
+    tolerance: float,
+    grace: float
+) -> None:
+    global _corpus_path, _best_dev, _eval_every, _tolerance, _grace
+    # every worker gets its own slice of the cores instead of each one
+    # starting a thread per core and fighting over them
+    torch.set_num_threads(threads)
+    _corpus_path = corpus_path
+    _best_dev = best_dev
+    _eval_every = eval_every
+    _tolerance = tolerance
+    _grace = grace
+
+def _run_config(args: tuple[int, Config]) -> dict[str, Any]:
+    index, config = args
+    assert _corpus_path is not None and _best_dev is not None
+    start = time.perf_counter()
+    row: dict[str, Any] = { 'index': index, **config }
+    try:
+        words = open(_corpus_path).read().splitlines()
+        tokenizer = Tokenizer(vocabulary=Tokenizer.compute_vocabulary(words), start_token='.')
+        # the parent built the cache entry, so this only maps the files
+        dataset = cached_dataset(_corpus_path, tokenizer, config['context_size'])
+        train_set, dev_set, _ = dataset.split([0.8, 0.1, 0.1])
+        g = torch.Generator().manual_seed(2147483647 + index)
+        model = MlpModel(
+            tokenizer,
+            context_size=config['context_size'],
+            embedding_dim=config['embedding_dim'],
+            hidden_dim=config['hidden_dim'],
+            generator=g
+        )
+        optimizer = Adam(model.parameters)
+        status, dev_loss, best = 'done', math.inf, math.inf
+        steps_run = 0
+        for epoch, lr in make_schedule(config):
+            mbis = torch.randint(0, len(train_set), (config['batch_size'], ), generator=g)
+            Xmb, Ymb = train_set.batch(mbis)
+            loss = F.cross_entropy(model.forward(Xmb), Ymb)
+            optimizer.zero_grad()
+            model.backward(loss)
+            optimizer.step(lr)
+            steps_run = epoch + 1
+            if steps_run % _eval_every == 0 and steps_run < config['steps']:
+                dev_loss = model.eval_dataset(dev_set)
+                best = min(best, dev_loss)
+                in_grace = steps_run < _grace * config['steps']
+                if _should_stop(steps_run // _eval_every - 1, dev_loss, in_grace):
+                    status = 'stopped'
+                    break
+        if status == 'done':
+            dev_loss = model.eval_dataset(dev_set)
+            best = min(best, dev_loss)
+        row.update(status=status, steps_run=steps_run, dev_loss=dev_loss, best_dev_loss=best)
+    except Exception:
+        row.update(status='failed', error=traceback.format_exc(limit=1).strip().splitlines()[-1])
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+def _should_stop(checkpoint: int, dev_loss: float, in_grace: bool) -> bool:
+    # compares against the best dev loss any config had reached after the
+    # same number of steps, and records this one if it is the new best.
+    # During the grace period losses are only recorded, slow starters
+    # (a lower lr...) are often still catching up
+    if not math.isfinite(dev_loss):
+        return True
+    if checkpoint >= len(_best_dev):
+        return False
+    with _best_dev.get_lock():
+        best = _best_dev[checkpoint]
+        if dev_loss < best:
+            _best_dev[checkpoint] = dev_loss
+            return False
+    return not in_grace and dev_loss > best * (1 + _tolerance)
+
+class Sweep:
+    def __init__(
+        self,
+        configs: list[Config],
+        corpus_path: str = './names.txt',
+        processes: Optional[int] = None,
+        eval_every: int = 1000,
+        tolerance: float = 0.05,
+        grace: float = 0.5
+    ) -> None:
+        # once a config is past the first grace fraction of its steps, it is
+        # stopped early when its dev loss is more than tolerance (relative)
+        # above the best seen at the same step by any config so far
+        for config in configs:
+            _check_keys(config)
+        self.configs = configs
+        self.corpus_path = corpus_path
+        cpus = os.cpu_count() or 1
+        self.processes = min(processes or cpus, len(configs)) or 1
+        self.threads = max(1, cpus // self.processes)
+        self.eval_every = eval_every
+        self.tolerance = tolerance
+        self.grace = grace
+
+    def run(self, results_path: str) -> list[dict[str, Any]]:
+        # builds each cache entry once up front, so workers only memory-map
+        # the encoded dataset and share its pages
+        words = open(self.corpus_path).read().splitlines()
+        tokenizer = Tokenizer(vocabulary=Tokenizer.compute_vocabulary(words), start_token='.')
+        for context_size in sorted({ c['context_size'] for c in self.configs }):
+            cached_dataset(self.corpus_path, tokenizer, context_size)
+
+        # spawn rather than fork, torch's thread pools don't survive a fork
+        ctx = mp.get_context('spawn')
+        checkpoints = max(c['steps'] for c in self.configs) // self.eval_every
+        best_dev = ctx.Array('d', [math.inf] * checkpoints)
+        fields = ['index', *DEFAULTS, 'status', 'steps_run', 'dev_loss', 'best_dev_loss', 'seconds', 'error']
+        rows: list[dict[str, Any]] = []
+        with open(results_path, 'w', newline='') as f, ctx.Pool(
+            self.processes,
+            initializer=_init_worker,
+            initargs=(self.threads, self.corpus_path, best_dev, self.eval_every, self.tolerance, self.grace)
+        ) as pool:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            # rows are written as configs finish, so the table is usable mid-sweep
+            for row in pool.imap_unordered(_run_config, list(enumerate(self.configs))):
+                writer.writerow(row)
+                f.flush()
+                rows.append(row)
+                summary = f"dev loss {row['dev_loss']:.4f}" if 'dev_loss' in row else row['error']
+                print(f"[{len(rows)}/{len(self.configs)}] config {row['index']} {row['status']}: {summary}")
+        return sorted(rows, key=lambda r: r.get('best_dev_loss', math.inf))
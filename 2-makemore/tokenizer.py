@@ -1,4 +1,5 @@
 from typing import Optional, overload
+import torch
 
 class Tokenizer:
     def __init__(
@@ -17,6 +18,11 @@ class Tokenizer:
         self.vocab_size = len(vocabulary)
         self._itos = self.vocabulary
         self._stoi = { s: i for i, s in enumerate(self._itos) }
+        # byte -> encoding lookup for bulk encoding, -1 where a byte isn't a token
+        self._byte_table = torch.full((256, ), -1, dtype=torch.long)
+        for s, i in self._stoi.items():
+            if len(s) == 1 and ord(s) < 256:
+                self._byte_table[ord(s)] = i
 
     @overload
     def encode(self, tokens: str) -> int:
@@ -78,6 +84,51 @@ class Tokenizer:
                 for w in words
             ]
 
+    def encode_corpus(
+        self,
+        words: list[str],
+        with_start: bool | int = True,
+        with_end: bool | int = True,
+        dtype: torch.dtype = torch.long
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        # same as encode(tokenize(word)) for every word, concatenated into one
+        # flat tensor. Word i spans flat[offsets[i]:offsets[i + 1]]
+        n_start, n_end = int(with_start), int(with_end)
+        start = self._stoi[self.start_token]
+        end = self._stoi[self.end_token]
+        lengths = torch.tensor([len(w) for w in words], dtype=torch.long)
+        offsets = torch.zeros(len(words) + 1, dtype=torch.long)
+        torch.cumsum(lengths + n_start + n_end, dim=0, out=offsets[1:])
+        flat = torch.full((int(offsets[-1]), ), start, dtype=dtype)
+        for j in range(n_end):
+            flat[offsets[1:] - n_end + j] = end
+        text = ''.join(words)
+        if not text:
+            return flat, offsets
+        try:
+            raw = bytearray(text.encode('latin-1'))
+        except UnicodeEncodeError:
+            raise ValueError('encode_corpus only supports single byte characters')
+        encs = self._byte_table[torch.frombuffer(raw, dtype=torch.uint8).long()]
+        if (encs < 0).any():
+            unknown = raw[int((encs < 0).nonzero()[0])]
+            raise KeyError(chr(unknown))
+        # char k of word i lands after the padding of words 0..i and i's start
+        word = torch.repeat_interleave(torch.arange(len(words)), lengths)
+        dest = torch.arange(len(encs)) + word * (n_start + n_end) + n_start
+        flat[dest] = encs.to(dtype)
+        return flat, offsets
+
+    def encode_pairs(self, words: list[str]) -> tuple[torch.Tensor, torch.Tensor]:
+        # every (enc1, enc2) bigram within a word of the corpus, as two index
+        # tensors. The pairs that straddle two words are dropped
+        flat, offsets = self.encode_corpus(words)
+        if len(flat) == 0:
+            return flat, flat
+        keep = torch.ones(len(flat) - 1, dtype=torch.bool)
+        keep[offsets[1:-1] - 1] = False
+        return flat[:-1][keep], flat[1:][keep]
+
     def untokenize(self, tokens: list[str], exclude_special_tokens: bool = True) -> str:
         if exclude_special_tokens:
             tokens = [
@@ -0,0 +1,175 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable
+from nn import MLP
+from value import Tape, Value, topological_order
+
+# a case builds its inputs, then returns a thunk to time and the amount of
+# work (ops, nodes, samples...) one call of that thunk does
+Case = Callable[[], tuple[Callable[[], object], int]]
+
+def build_loss(n: MLP, xs: list[list[float]], ys: list[float]) -> Value:
+    ypreds = [n(x)[0] for x in xs]
+    return sum((yout - ygt)**2 for ygt, yout in zip(ys, ypreds)) # type: ignore
+
+def value_arithmetic(n: int = 100000) -> Case:
+    def setup():
+        a, b, c = Value(0.5), Value(-1.5), Value(2.0)
+        def run():
+            for _ in range(n):
+                a * b + c
+        # two ops per iteration
+        return run, 2 * n
+    return setup
+
+def backward_chain(depth: int = 100000) -> Case:
+    def setup():
+        x = Value(0.5)
+        y = x
+        for _ in range(depth):
+            y = y * 1.0 + 0.0
+        nodes = len(topological_order(y))
+        return y.backward, nodes
+    return setup
+
+def backward_wide(width: int = 100000) -> Case:
+    def setup():
+        leaves = [Value(random.uniform(-1, 1)) for _ in range(width)]
+        y: Value = sum(leaf * leaf for leaf in leaves) # type: ignore
+        nodes = len(topological_order(y))
+        return y.backward, nodes
+    return setup
+
+def _mlp_data(nin: int, nouts: list[int], samples: int) -> tuple[MLP, list[list[float]], list[float]]:
+    random.seed(0)
+    n = MLP(nin, nouts)
+    xs = [[random.uniform(-1, 1) for _ in range(nin)] for _ in range(samples)]
+    ys = [random.uniform(-1, 1) for _ in range(samples)]
+    return n, xs, ys
+
+def mlp_forward(nin: int, nouts: list[int], samples: int = 16) -> Case:
+    def setup():
+        n, xs, ys = _mlp_data(nin, nouts, samples)
+        # graph nodes built, parameters are allocated up front so not counted
+        nodes = len(topological_order(build_loss(n, xs, ys))) - len(n.parameters())
+        return lambda: build_loss(n, xs, ys), nodes
+    return setup
+
+def mlp_backward(nin: int, nouts: list[int], samples: int = 16) -> Case:
+    def setup():
+        n, xs, ys = _mlp_data(nin, nouts, samples)
+        nodes = len(topological_order(build_loss(n, xs, ys)))
+        def run():
+            loss = build_loss(n, xs, ys)
+            n.zero_grad()
+            loss.backward()
+        return run, nodes
+    return setup
+
+def train_loop(steps: int = 200) -> Case:
+    # the loop from main.py, measured in steps
+    def setup():
+        xs = [
+            [2.0, 3.0, -1.0],
+            [3.0, -1.0, 0.5],
+            [0.5, 1.0, 1.0],
+            [1.0, 1.0, -1.0]
+        ]
+        ys = [1.0, -1.0, -1.0, 1.0]
+        random.seed(0)
+        n = MLP(3, [4, 4, 1])
+        tape = Tape()
+        def run():
+            for _ in range(steps):
+                with tape:
+                    loss = build_loss(n, xs, ys)
+                n.zero_grad()
+                tape.backward(loss, release=True)
+                n.sgd_step(0.1)
+        return run, steps
+    return setup
+
+def suite() -> dict[str, Case]:
+    cases: dict[str, Case] = {
+        'value_arithmetic': value_arithmetic(),
+        'backward_chain': backward_chain(),
+        'backward_wide': backward_wide(),
+    }
+    for width in [8, 32]:
+        for depth in [1, 2, 3]:
+            nouts = [width] * depth + [1]
+            cases[f'mlp_forward_w{width}_d{depth}'] = mlp_forward(width, nouts)
+            cases[f'mlp_backward_w{width}_d{depth}'] = mlp_backward(width, nouts)
+    cases['train_loop'] = train_loop()
+    return cases
+
+def run_case(case: Case, repeats: int) -> dict[str, float]:
+    run, work = case()
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    # memory is measured on a separate run, tracemalloc slows everything down
+    run, work = case()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'seconds': best,
+        'per_sec': work / best,
+        'peak_bytes': peak,
+        'bytes_per_unit': peak / work,
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if stats['per_sec'] < base['per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: {base['per_sec']:,.0f} -> {stats['per_sec']:,.0f} per sec")
+        if stats['peak_bytes'] > base['peak_bytes'] * (1 + tolerance):
+            regressions.append(f"{name}: {base['peak_bytes']:,} -> {stats['peak_bytes']:,} peak bytes")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='micrograd benchmarks')
+    parser.add_argument('-k', '--filter', default='', help='only run cases containing this string')
+    parser.add_argument('-r', '--repeats', type=int, default=3)
+    parser.add_argument('-o', '--output', help='write results as json')
+    parser.add_argument('-c', '--compare', help='baseline json to flag regressions against')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.1, help='allowed relative slowdown')
+    args = parser.parse_args()
+
+    results = {}
+    for name, case in suite().items():
+        if args.filter not in name:
+            continue
+        results[name] = run_case(case, args.repeats)
+        stats = results[name]
+        print(
+            f"{name:<24}{stats['per_sec']:>16,.0f}/s{stats['seconds']:>10.4f}s"
+            f"{stats['peak_bytes'] / 2**20:>10.2f} MiB"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import math
+from typing import Callable, Sequence
+from params import Parameter, ParameterStore
+from value import (
+    ADD, DIV, EXP, LINEAR, LINEAR_TANH, MUL, NEG, POW, SUB, TANH, Value, topological_order
+)
+
+GraphFn = Callable[[list[Value]], Value]
+
+class CompiledStep:
+    def __init__(self, source: str, store: ParameterStore, n_inputs: int) -> None:
+        self.source = source
+        self.store = store
+        self.n_inputs = n_inputs
+        namespace: dict = { '_tanh': math.tanh, '_exp': math.exp }
+        exec(compile(source, '<micrograd-compiled>', 'exec'), namespace)
+        self._fn = namespace['step']
+
+    def __call__(self, inputs: Sequence[float]) -> float:
+        # forward + backward, accumulating into store.grad like Value.backward
+        assert len(inputs) == self.n_inputs
+        return self._fn(self.store._data, inputs, self.store._grad)
+
+    def check(self, fn: GraphFn, inputs: Sequence[float], tol: float = 1e-9) -> float:
+        # compare against the interpreted graph, returns the max abs grad difference
+        self.store.zero_grad()
+        loss = fn([Value(x) for x in inputs])
+        loss.backward()
+        expected = self.store.grad.copy()
+        self.store.zero_grad()
+        compiled_loss = self(inputs)
+        error = max(abs(compiled_loss - loss.data), float(abs(self.store.grad - expected).max()))
+        self.store.zero_grad()
+        assert error <= tol, f'compiled step deviates from Value.backward by {error}'
+        return error
+
+def compile_graph(fn: GraphFn, example_inputs: Sequence[float], store: ParameterStore) -> CompiledStep:
+    # trace fn once on example inputs, then emit straight-line python computing
+    # the root and its parameter gradients from flat buffers. Only valid while
+    # fn builds the same graph for every input, i.e. no data dependent branching
+    inputs = [Value(x) for x in example_inputs]
+    root = fn(inputs)
+    topo = topological_order(root)
+    input_index = { node: i for i, node in enumerate(inputs) }
+    names = { node: f'v{i}' for i, node in enumerate(topo) }
+
+    lines = ['def step(p, x, gp):']
+    for node in topo:
+        name = names[node]
+        lines.append(f'    {name} = {_forward_expr(node, names, input_index, store)}')
+
+    # reverse pass, the first contribution to a grad assigns and later ones add
+    grads: set[Value] = set()
+    def accumulate(child: Value, expr: str) -> None:
+        # only parameter leaves need their grads, inputs and constants don't
+        if not child._prev and not isinstance(child, Parameter):
+            return
+        op = '+=' if child in grads else '='
+        grads.add(child)
+        lines.append(f'    g{names[child][1:]} {op} {expr}')
+
+    root_grad = 'g' + names[root][1:]
+    lines.append(f'    {root_grad} = 1.0')
+    grads.add(root)
+    for node in reversed(topo):
+        if node not in grads or not node._prev:
+            continue
+        g = 'g' + names[node][1:]
+        _backward_exprs(node, g, names, accumulate, lines.append)
+
+    for node in topo:
+        if isinstance(node, Parameter) and node in grads:
+            lines.append(f'    gp[{node._index}] += g{names[node][1:]}')
+    lines.append(f'    return {names[root]}')
+    return CompiledStep('\n'.join(lines) + '\n', store, len(inputs))
+
+def _forward_expr(
+    node: Value,
+    names: dict[Value, str],
+    input_index: dict[Value, int],
+    store: ParameterStore
+) -> str:
+    if isinstance(node, Parameter):
+        if node._store is not store:
+            raise ValueError('graph uses a parameter outside of the compiled store')
+        return f'p[{node._index}]'
+    if node in input_index:
+        return f'x[{input_index[node]}]'
+    if not node._prev:
+        return repr(float(node.data))
+    op = node._op
+    args = [names[child] for child in node._prev]
+    if op is ADD:
+        return f'{args[0]} + {args[1]}'
+    if op is SUB:
+        return f'{args[0]} - {args[1]}'
+    if op is MUL:
+        return f'{args[0]} * {args[1]}'
+    if op is DIV:
+        return f'{args[0]} / {args[1]}'
+    if op is NEG:
+        return f'-{args[0]}'
+    if op is TANH:
+        return f'_tanh({args[0]})'
+    if op is EXP:
+        return f'_exp({args[0]})'
+    if op is POW:
+        return f'{args[0]} ** {node._arg!r}'
+    if op is LINEAR or op is LINEAR_TANH:
+        w, x = _linear_operands(node, names)
+        act = ' + '.join([args[0]] + [f'{wi} * {xi}' for wi, xi in zip(w, x)])
+        return f'_tanh({act})' if op is LINEAR_TANH else act
+    raise ValueError(f'cannot compile op {op!r}')
+
+def _backward_exprs(
+    node: Value,
+    g: str,
+    names: dict[Value, str],
+    accumulate: Callable[[Value, str], None],
+    emit: Callable[[str], None]
+) -> None:
+    op = node._op
+    out = names[node]
+    if op is ADD:
+        a, b = node._prev
+        accumulate(a, g)
+        accumulate(b, g)
+    elif op is SUB:
+        a, b = node._prev
+        accumulate(a, g)
+        accumulate(b, f'-{g}')
+    elif op is MUL:
+        a, b = node._prev
+        accumulate(a, f'{names[b]} * {g}')
+        accumulate(b, f'{names[a]} * {g}')
+    elif op is DIV:
+        a, b = node._prev
+        accumulate(a, f'{g} / {names[b]}')
+        accumulate(b, f'-{g} * {names[a]} / {names[b]} ** 2')
+    elif op is NEG:
+        a, = node._prev
+        accumulate(a, f'-{g}')
+    elif op is TANH:
+        a, = node._prev
+        accumulate(a, f'(1 - {out} * {out}) * {g}')
+    elif op is EXP:
+        a, = node._prev
+        accumulate(a, f'{out} * {g}')
+    elif op is POW:
+        a, = node._prev
+        accumulate(a, f'{node._arg!r} * {names[a]} ** {(node._arg - 1)!r} * {g}')
+    elif op is LINEAR or op is LINEAR_TANH:
+        if op is LINEAR_TANH:
+            emit(f'    d{out[1:]} = (1 - {out} * {out}) * {g}')
+            g = f'd{out[1:]}'
+        prev = node._prev
+        n = len(node._arg)
+        w, x = _linear_operands(node, names)
+        accumulate(prev[0], g)
+        for i in range(n):
+            accumulate(prev[1 + i], f'{x[i]} * {g}')
+        if len(prev) > n + 1:
+            for i in range(n):
+                accumulate(prev[1 + n + i], f'{w[i]} * {g}')
+
+def _linear_operands(node: Value, names: dict[Value, str]) -> tuple[list[str], list[str]]:
+    # names of the weights and inputs, float inputs are baked in as literals
+    prev = node._prev
+    n = len(node._arg)
+    w = [names[child] for child in prev[1:n + 1]]
+    if len(prev) > n + 1:
+        x = [names[child] for child in prev[n + 1:]]
+    else:
+        x = [repr(float(xi)) for xi in node._arg]
+    return w, x
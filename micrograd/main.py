@@ -1,5 +1,5 @@
 from nn import MLP
-from value import Value
+from value import Tape, Value
 
 def main():
     # data
@@ -15,15 +15,20 @@ def main():
     n = MLP(3, [4, 4, 1])
 
     # training loop
+    # the tape records nodes in creation order, which backward walks directly
+    tape = Tape()
     for i in range(10000):
-        ypreds = [n(x)[0] for x in xs]
-        loss = sum(((yout - ygt)**2 for ygt, yout in zip(ys, ypreds)), Value(0))
+        with tape:
+            ypreds = [n(x)[0] for x in xs]
+            loss: Value = sum((yout - ygt)**2 for ygt, yout in zip(ys, ypreds)) # type: ignore
         if i % 1000 == 0:
             print('Current loss', loss.data)
-        loss.zero_grad()
-        loss.backward()
-        for p in n.parameters():
-            p.data += - 0.1 * p.grad
+        n.zero_grad()
+        tape.backward(loss, release=True)
+        n.sgd_step(0.1)
+
+    # predictions don't need a graph
+    print('Predictions', [n.predict(x)[0] for x in xs])
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,41 @@
+from compiler import compile_graph
+from nn import MLP
+from value import Value
+
+def main():
+    # data
+    xs = [
+        [2.0, 3.0, -1.0],
+        [3.0, -1.0, 0.5],
+        [0.5, 1.0, 1.0],
+        [1.0, 1.0, -1.0]
+    ]
+    ys = [1.0, -1.0, -1.0, 1.0]
+
+    # nn
+    n = MLP(3, [4, 4, 1])
+
+    # inputs are passed flat: every sample's features followed by the targets
+    nin = len(xs[0])
+    def loss_fn(inputs: list[Value]) -> Value:
+        targets = inputs[nin * len(ys):]
+        ypreds = [n(inputs[i * nin:(i + 1) * nin])[0] for i in range(len(ys))]
+        return sum((yout - ygt)**2 for ygt, yout in zip(targets, ypreds)) # type: ignore
+    inputs = [x for sample in xs for x in sample] + ys
+
+    # trace once, check against the interpreted graph, then reuse every step
+    step = compile_graph(loss_fn, inputs, n._store) # type: ignore
+    print('Max deviation from Value.backward', step.check(loss_fn, inputs))
+
+    # training loop
+    for i in range(10000):
+        n.zero_grad()
+        loss = step(inputs)
+        if i % 1000 == 0:
+            print('Current loss', loss)
+        n.sgd_step(0.1)
+
+    print('Predictions', [n.predict(x)[0] for x in xs])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import random
+import time
+import numpy as np
+from nn import MLP
+from parallel import DataParallel, squared_error
+from value import Tape
+
+def main():
+    # data: a random batch, big enough for the workers to have real work
+    random.seed(0)
+    xs = [[random.uniform(-1, 1) for _ in range(8)] for _ in range(256)]
+    ys = [1.0 if sum(x) > 0 else -1.0 for x in xs]
+
+    # nn, the parallel run starts from an identical copy of the weights
+    n = MLP(8, [16, 16, 1])
+    n_parallel = MLP(8, [16, 16, 1])
+    n_parallel._store.data[:] = n._store.data # type: ignore
+    STEPS = 20
+    LR = 0.01
+
+    # single process
+    tape = Tape()
+    final_loss = 0.0
+    start = time.perf_counter()
+    for i in range(STEPS):
+        with tape:
+            loss = squared_error(n, xs, ys)
+        n.zero_grad()
+        final_loss = loss.data
+        tape.backward(loss, release=True)
+        n.sgd_step(LR)
+    elapsed = time.perf_counter() - start
+    print(f'Single process: loss {final_loss:.6f}, {STEPS * len(xs) / elapsed:,.0f} samples/s')
+
+    # data parallel
+    loss_parallel = 0.0
+    with DataParallel(n_parallel) as dp:
+        start = time.perf_counter()
+        for i in range(STEPS):
+            loss_parallel = dp.loss_and_grad(xs, ys)
+            n_parallel.sgd_step(LR)
+        elapsed = time.perf_counter() - start
+    print(
+        f'{dp.processes} processes: loss {loss_parallel:.6f}, '
+        f'{STEPS * len(xs) / elapsed:,.0f} samples/s'
+    )
+
+    # shards are summed in a different order, so only equal up to rounding
+    diff = np.abs(n._store.data - n_parallel._store.data).max() # type: ignore
+    print('Max parameter difference', diff)
+    assert diff < 1e-9
+
+if __name__ == '__main__':
+    main()
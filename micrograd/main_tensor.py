@@ -0,0 +1,30 @@
+import numpy as np
+from tensor_nn import TensorMLP
+
+def main():
+    # data, one row per sample
+    xs = np.array([
+        [2.0, 3.0, -1.0],
+        [3.0, -1.0, 0.5],
+        [0.5, 1.0, 1.0],
+        [1.0, 1.0, -1.0]
+    ])
+    ys = np.array([[1.0], [-1.0], [-1.0], [1.0]])
+
+    # nn
+    n = TensorMLP(3, [4, 4, 1])
+
+    # training loop, the whole batch goes through each layer as one matmul
+    for i in range(10000):
+        ypreds = n(xs)
+        loss = ((ypreds - ys)**2).sum()
+        if i % 1000 == 0:
+            print('Current loss', loss.data)
+        for p in n.parameters():
+            p.zero_grad()
+        loss.backward()
+        for p in n.parameters():
+            p.data += - 0.1 * p.grad
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,135 @@
-from typing import Union
+from __future__ import annotations
+from typing import Any, Optional, Union
+import json
+import math
 import random
-from value import Value
+import struct
+import numpy as np
+from params import Parameter, ParameterStore
+from value import Value, linear_tanh
 
-class Neuron:
+class Module:
+    _store: Optional[ParameterStore] = None
+
+    def flatten(self, store: Optional[ParameterStore] = None) -> ParameterStore:
+        # rebind every parameter to a slot in one contiguous buffer. A new store
+        # starts from the current values, a given store keeps its own contents
+        params = self.parameters()
+        if store is None:
+            store = ParameterStore(len(params))
+            store.data[:] = [p.data for p in params]
+        assert len(store) == len(params), 'store size does not match the parameter count'
+        for i, p in enumerate(params):
+            p._bind(store, i)
+        self._store = store
+        return store
+
+    def zero_grad(self) -> None:
+        if self._store is not None:
+            self._store.zero_grad()
+            return
+        for p in self.parameters():
+            p.grad = 0
+
+    def sgd_step(self, lr: float) -> None:
+        if self._store is not None:
+            self._store.sgd_step(lr)
+            return
+        for p in self.parameters():
+            p.data += -lr * p.grad
+
+    def grad_norm(self) -> float:
+        if self._store is not None:
+            return self._store.grad_norm()
+        return math.sqrt(sum(p.grad**2 for p in self.parameters()))
+
+    def clip_grad_norm(self, max_norm: float) -> float:
+        if self._store is not None:
+            return self._store.clip_grad_norm(max_norm)
+        norm = self.grad_norm()
+        if norm > max_norm:
+            for p in self.parameters():
+                p.grad *= max_norm / norm
+        return norm
+
+    def parameters(self) -> list[Parameter]:
+        return []
+
+    def config(self) -> dict[str, Any]:
+        # constructor arguments that rebuild this architecture
+        return {}
+
+    def save(self, path: str) -> None:
+        # magic, header length, json header with the architecture, then the
+        # parameters as one packed little endian float64 array, 8 byte aligned
+        params = self.parameters()
+        if self._store is not None:
+            data = self._store.data
+        else:
+            data = np.array([p.data for p in params])
+        header = json.dumps({
+            'class': type(self).__name__,
+            'config': self.config(),
+            'size': len(params),
+        }).encode()
+        header += b' ' * (-(len(_MAGIC) + 8 + len(header)) % 8)
+        with open(path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            f.write(data.astype('<f8').tobytes())
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Module:
+        # with mmap the weights are a read-only view of the file, so loading is
+        # instant and processes loading the same file share its pages. Load
+        # with mmap=False to get a private copy that can be trained
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f'{path} is not a micrograd checkpoint')
+            header_len, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_len))
+        offset = len(_MAGIC) + 8 + header_len
+        if header['class'] != cls.__name__:
+            raise ValueError(f"{path} holds a {header['class']}, not a {cls.__name__}")
+        module = cls(**header['config'])
+        size = header['size']
+        if mmap:
+            data = np.memmap(path, dtype='<f8', mode='r', offset=offset, shape=(size, ))
+        else:
+            data = np.fromfile(path, dtype='<f8', count=size, offset=offset)
+        module.flatten(ParameterStore(size, data=data))
+        return module
+
+_MAGIC = b'MICROGRD'
+
+class Neuron(Module):
     def __init__(self, nin: int) -> None:
-        self.w = [Value(random.uniform(-1, 1)) for _ in range(nin)]
-        self.b = Value(random.uniform(-1, 1))
+        # backed by a store of its own until a parent module flattens it
+        store = ParameterStore(nin + 1)
+        store.data[:] = [random.uniform(-1, 1) for _ in range(nin + 1)]
+        self.w = [Parameter(store, i) for i in range(nin)]
+        self.b = Parameter(store, nin)
 
     def __call__(self, x: Union[list[Value], list[float]]) -> Value:
         assert len(x) == len(self.w)
-        act = sum((wi * xi for wi, xi in zip(self.w, x)), self.b)
-        result = act.tanh()
-        return result
+        return linear_tanh(self.w, x, self.b)
+
+    def predict(self, x: list[float]) -> float:
+        # plain float arithmetic, no graph is built
+        assert len(x) == len(self.w)
+        act = self.b.data
+        for wi, xi in zip(self.w, x):
+            act += wi.data * xi
+        return math.tanh(act)
 
-    def parameters(self) -> list[Value]:
+    def parameters(self) -> list[Parameter]:
         return self.w + [self.b]
 
-class Layer:
+    def config(self) -> dict[str, Any]:
+        return { 'nin': len(self.w) }
+
+class Layer(Module):
     def __init__(self, nin: int, nout: int) -> None:
         self.neurons = [Neuron(nin) for _ in range(nout)]
 
@@ -24,24 +137,41 @@ class Layer:
         results = [n(x) for n in self.neurons]
         return results
 
-    def parameters(self) -> list[Value]:
-        params: list[Value] = []
+    def predict(self, x: list[float]) -> list[float]:
+        return [n.predict(x) for n in self.neurons]
+
+    def parameters(self) -> list[Parameter]:
+        params: list[Parameter] = []
         for neuron in self.neurons:
             params.extend(neuron.parameters())
         return params
 
-class MLP:
+    def config(self) -> dict[str, Any]:
+        return { 'nin': len(self.neurons[0].w), 'nout': len(self.neurons) }
+
+class MLP(Module):
     def __init__(self, nin: int, nouts: list[int]) -> None:
+        self.nin = nin
+        self.nouts = nouts
         sz = [nin] + nouts
         self.layers = [Layer(sz[i], sz[i+1]) for i in range(len(nouts))]
+        self.flatten()
 
     def __call__(self, x: Union[list[Value], list[float]]) -> list[Value]:
         for layer in self.layers:
             x = layer(x)
         return x # type: ignore
 
-    def parameters(self) -> list[Value]:
-        params: list[Value] = []
+    def predict(self, x: list[float]) -> list[float]:
+        for layer in self.layers:
+            x = layer.predict(x)
+        return x
+
+    def parameters(self) -> list[Parameter]:
+        params: list[Parameter] = []
         for layer in self.layers:
             params.extend(layer.parameters())
         return params
+
+    def config(self) -> dict[str, Any]:
+        return { 'nin': self.nin, 'nouts': self.nouts }
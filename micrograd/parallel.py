@@ -0,0 +1,89 @@
+from __future__ import annotations
+import multiprocessing as mp
+from typing import Callable, Optional
+import numpy as np
+from nn import MLP
+from params import ParameterStore
+from value import Tape, Value
+
+LossFn = Callable[[MLP, list[list[float]], list[float]], Value]
+
+def squared_error(n: MLP, xs: list[list[float]], ys: list[float]) -> Value:
+    ypreds = [n(x)[0] for x in xs]
+    return sum((yout - ygt)**2 for ygt, yout in zip(ys, ypreds)) # type: ignore
+
+# per worker process state, set up once by _init_worker
+_replica: Optional[MLP] = None
+_grads: Optional[np.ndarray] = None
+_loss_fn: Optional[LossFn] = None
+_tape: Optional[Tape] = None
+
+def _init_worker(nin: int, nouts: list[int], data, grads, loss_fn: LossFn) -> None:
+    global _replica, _grads, _loss_fn, _tape
+    _replica = MLP(nin, nouts)
+    size = len(_replica.parameters())
+    # the replica reads the weights straight out of the shared buffer, so
+    # updates made by the main process need no explicit broadcast
+    _replica.flatten(ParameterStore(size, data=np.frombuffer(data)))
+    _grads = np.frombuffer(grads).reshape(-1, size)
+    _loss_fn = loss_fn
+    _tape = Tape()
+
+def _shard_grad(args: tuple[int, list[list[float]], list[float]]) -> float:
+    shard, xs, ys = args
+    assert _replica is not None and _grads is not None and _loss_fn is not None and _tape is not None
+    if not xs:
+        # more workers than samples
+        _grads[shard] = 0.0
+        return 0.0
+    with _tape:
+        loss = _loss_fn(_replica, xs, ys)
+    _replica.zero_grad()
+    _tape.backward(loss, release=True)
+    _grads[shard] = _replica._store.grad # type: ignore
+    return loss.data
+
+class DataParallel:
+    def __init__(
+        self,
+        model: MLP,
+        processes: Optional[int] = None,
+        loss_fn: LossFn = squared_error
+    ) -> None:
+        self.model = model
+        self.processes = processes or mp.cpu_count()
+        size = len(model.parameters())
+        # weights are shared by every worker, each shard writes its own grad row
+        data = mp.RawArray('d', size)
+        grads = mp.RawArray('d', self.processes * size)
+        store = ParameterStore(size, data=np.frombuffer(data))
+        store.data[:] = model._store.data # type: ignore
+        model.flatten(store)
+        self._grads = np.frombuffer(grads).reshape(self.processes, size)
+        self._pool = mp.Pool(
+            self.processes,
+            initializer=_init_worker,
+            initargs=(model.nin, model.nouts, data, grads, loss_fn)
+        )
+
+    def loss_and_grad(self, xs: list[list[float]], ys: list[float]) -> float:
+        # each worker differentiates one shard, then the grad rows are summed
+        # (the all-reduce) into the model's grad buffer
+        bounds = np.linspace(0, len(xs), self.processes + 1).astype(int)
+        tasks = [
+            (k, xs[bounds[k]:bounds[k + 1]], ys[bounds[k]:bounds[k + 1]])
+            for k in range(self.processes)
+        ]
+        losses = self._pool.map(_shard_grad, tasks)
+        self._grads.sum(axis=0, out=self.model._store.grad) # type: ignore
+        return sum(losses)
+
+    def close(self) -> None:
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self) -> DataParallel:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
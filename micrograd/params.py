@@ -0,0 +1,73 @@
+from __future__ import annotations
+from typing import Optional
+import numpy as np
+from value import Value
+
+class ParameterStore:
+    def __init__(
+        self,
+        size: int,
+        data: Optional[np.ndarray] = None,
+        grad: Optional[np.ndarray] = None
+    ) -> None:
+        self.data = np.zeros(size) if data is None else data
+        self.grad = np.zeros(size) if grad is None else grad
+        assert self.data.shape == self.grad.shape == (size, )
+        # memoryviews over the same memory hand out plain python floats, which
+        # keeps scalar access from Parameters cheap. Casting through bytes
+        # types them as float views
+        self._data = self.data.data.cast('B').cast('d')
+        self._grad = self.grad.data.cast('B').cast('d')
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def zero_grad(self) -> None:
+        self.grad.fill(0.0)
+
+    def sgd_step(self, lr: float) -> None:
+        self.data -= lr * self.grad
+
+    def grad_norm(self) -> float:
+        return float(np.sqrt(self.grad @ self.grad))
+
+    def clip_grad_norm(self, max_norm: float) -> float:
+        norm = self.grad_norm()
+        if norm > max_norm:
+            self.grad *= max_norm / norm
+        return norm
+
+class Parameter(Value):
+    # data and grad live at _index in a ParameterStore's buffers
+    __slots__ = ('_store', '_index', '_data', '_grad')
+
+    def __init__(self, store: ParameterStore, index: int) -> None:
+        self._prev = ()
+        self._op = ''
+        self._arg = 0.0
+        self._bind(store, index)
+
+    def _bind(self, store: ParameterStore, index: int) -> None:
+        self._store = store
+        self._index = index
+        self._data = store._data
+        self._grad = store._grad
+
+    @property
+    def data(self) -> float:
+        return self._data[self._index]
+
+    @data.setter
+    def data(self, value: float) -> None:
+        self._data[self._index] = value
+
+    @property
+    def grad(self) -> float:
+        return self._grad[self._index]
+
+    @grad.setter
+    def grad(self, value: float) -> None:
+        self._grad[self._index] = value
+
+    def __repr__(self) -> str:
+        return f"Parameter(data={self.data})"
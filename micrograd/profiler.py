@@ -0,0 +1,85 @@
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+import value
+from value import Value
+
+class Report:
+    def __init__(self) -> None:
+        # nodes allocated per op ('' for leaves) and the most alive at once
+        self.allocations: dict[str, int] = {}
+        self.peak_live = 0
+        # _backward calls and the seconds spent in them, per op
+        self.backward_calls: dict[str, int] = {}
+        self.backward_time: dict[str, float] = {}
+        # seconds spent sorting the graph vs running the backward pass
+        self.phase_time: dict[str, float] = { 'topo': 0.0, 'backward': 0.0 }
+
+    def __str__(self) -> str:
+        lines = [f"{'op':<12}{'allocated':>12}{'backward calls':>16}{'backward s':>12}"]
+        for op in sorted(set(self.allocations) | set(self.backward_calls)):
+            lines.append(
+                f"{op or 'leaf':<12}{self.allocations.get(op, 0):>12}"
+                f"{self.backward_calls.get(op, 0):>16}{self.backward_time.get(op, 0.0):>12.4f}"
+            )
+        lines.append(f'peak live nodes {self.peak_live}')
+        lines.append(', '.join(f'{phase} {t:.4f}s' for phase, t in self.phase_time.items()))
+        return '\n'.join(lines)
+
+@contextmanager
+def profile() -> Iterator[Report]:
+    # instrumentation is patched in for the duration of the block and removed
+    # afterwards, so it costs nothing when not profiling
+    assert '__del__' not in Value.__dict__, 'profile() cannot be nested'
+    report = Report()
+    live: set[int] = set()
+    init = Value.__init__
+    node_backward = Value._backward
+    topological_order = value.topological_order
+    run_backward = value.run_backward
+
+    def counting_init(self: Value, data: float, _children: tuple = (), _op: str = '', _arg: Any = 0.0) -> None:
+        init(self, data, _children, _op, _arg)
+        report.allocations[_op] = report.allocations.get(_op, 0) + 1
+        live.add(id(self))
+        if len(live) > report.peak_live:
+            report.peak_live = len(live)
+
+    def counting_del(self: Value) -> None:
+        live.discard(id(self))
+
+    def timed_node_backward(self: Value) -> None:
+        start = time.perf_counter()
+        node_backward(self)
+        op = self._op
+        report.backward_time[op] = report.backward_time.get(op, 0.0) + time.perf_counter() - start
+        report.backward_calls[op] = report.backward_calls.get(op, 0) + 1
+
+    def timed_topological_order(root: Value) -> list[Value]:
+        start = time.perf_counter()
+        try:
+            return topological_order(root)
+        finally:
+            report.phase_time['topo'] += time.perf_counter() - start
+
+    def timed_run_backward(root: Value, topo: list[Value], release: bool = False) -> None:
+        start = time.perf_counter()
+        try:
+            run_backward(root, topo, release=release)
+        finally:
+            report.phase_time['backward'] += time.perf_counter() - start
+
+    Value.__init__ = counting_init # type: ignore
+    Value.__del__ = counting_del # type: ignore
+    Value._backward = timed_node_backward # type: ignore
+    value.topological_order = timed_topological_order
+    value.run_backward = timed_run_backward
+    try:
+        yield report
+    finally:
+        Value.__init__ = init # type: ignore
+        del Value.__del__ # type: ignore
+        Value._backward = node_backward # type: ignore
+        value.topological_order = topological_order
+        value.run_backward = run_backward
@@ -0,0 +1,146 @@
+from __future__ import annotations
+from typing import Optional, Union
+import numpy as np
+from value import topological_order
+
+ArrayLike = Union['Tensor', np.ndarray, float, int, list]
+
+def _unbroadcast(grad: np.ndarray, shape: tuple[int, ...]) -> np.ndarray:
+    # sum out the axes numpy broadcast over so grad matches the operand's shape
+    while grad.ndim > len(shape):
+        grad = grad.sum(axis=0)
+    for axis, size in enumerate(shape):
+        if size == 1 and grad.shape[axis] != 1:
+            grad = grad.sum(axis=axis, keepdims=True)
+    return grad
+
+class Tensor:
+    # keeps numpy from claiming mixed expressions: ndarray - Tensor falls back
+    # to Tensor.__rsub__ instead of giving an object array
+    __array_ufunc__ = None
+
+    def __init__(
+        self,
+        data: ArrayLike,
+        _children: tuple[Tensor, ...] = (),
+        _op: str = ''
+    ) -> None:
+        self.data = np.asarray(data, dtype=np.float64)
+        self.grad = np.zeros_like(self.data)
+        self._backward = lambda: None
+        self._prev = set(_children)
+        self._op = _op
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.data.shape
+
+    def backward(self) -> None:
+        topo = topological_order(self)
+        self.grad = np.ones_like(self.data)
+        for node in reversed(topo):
+            node._backward()
+
+    def zero_grad(self) -> None:
+        self.grad = np.zeros_like(self.data)
+
+    def tanh(self) -> Tensor:
+        t = np.tanh(self.data)
+        result = Tensor(t, (self, ), 'tanh')
+        def _backward():
+            self.grad += (1 - t**2) * result.grad
+        result._backward = _backward
+        return result
+
+    def exp(self) -> Tensor:
+        e = np.exp(self.data)
+        result = Tensor(e, (self, ), 'exp')
+        def _backward():
+            self.grad += e * result.grad
+        result._backward = _backward
+        return result
+
+    def sum(self, axis: Optional[int] = None, keepdims: bool = False) -> Tensor:
+        result = Tensor(self.data.sum(axis=axis, keepdims=keepdims), (self, ), 'sum')
+        def _backward():
+            grad = result.grad
+            if axis is not None and not keepdims:
+                grad = np.expand_dims(grad, axis)
+            self.grad += np.broadcast_to(grad, self.shape)
+        result._backward = _backward
+        return result
+
+    def mean(self, axis: Optional[int] = None, keepdims: bool = False) -> Tensor:
+        n = self.data.size if axis is None else self.shape[axis]
+        return self.sum(axis=axis, keepdims=keepdims) * (1.0 / n)
+
+    def __matmul__(self, other: ArrayLike) -> Tensor:
+        other = other if isinstance(other, Tensor) else Tensor(other)
+        assert 1 <= self.data.ndim <= 2 and 1 <= other.data.ndim <= 2, 'matmul expects 1-D or 2-D operands'
+        result = Tensor(self.data @ other.data, (self, other), '@')
+        def _backward():
+            # promote vectors the way matmul does (row on the left, column on
+            # the right) so the matrix rules apply, then drop the extra axis
+            a = self.data.reshape(1, -1) if self.data.ndim == 1 else self.data
+            b = other.data.reshape(-1, 1) if other.data.ndim == 1 else other.data
+            grad = result.grad.reshape(a.shape[0], b.shape[1])
+            self.grad += (grad @ b.T).reshape(self.shape)
+            other.grad += (a.T @ grad).reshape(other.shape)
+        result._backward = _backward
+        return result
+
+    def __rmatmul__(self, other: ArrayLike) -> Tensor:
+        return Tensor(other) @ self
+
+    def __add__(self, other: ArrayLike) -> Tensor:
+        other = other if isinstance(other, Tensor) else Tensor(other)
+        result = Tensor(self.data + other.data, (self, other), '+')
+        def _backward():
+            self.grad += _unbroadcast(result.grad, self.shape)
+            other.grad += _unbroadcast(result.grad, other.shape)
+        result._backward = _backward
+        return result
+
+    def __radd__(self, other: ArrayLike) -> Tensor:
+        return self + other
+
+    def __neg__(self) -> Tensor:
+        return self * -1
+
+    def __sub__(self, other: ArrayLike) -> Tensor:
+        other = other if isinstance(other, Tensor) else Tensor(other)
+        return self + -other
+
+    def __rsub__(self, other: ArrayLike) -> Tensor:
+        return -self + other
+
+    def __mul__(self, other: ArrayLike) -> Tensor:
+        other = other if isinstance(other, Tensor) else Tensor(other)
+        result = Tensor(self.data * other.data, (self, other), '*')
+        def _backward():
+            self.grad += _unbroadcast(other.data * result.grad, self.shape)
+            other.grad += _unbroadcast(self.data * result.grad, other.shape)
+        result._backward = _backward
+        return result
+
+    def __rmul__(self, other: ArrayLike) -> Tensor:
+        return self * other
+
+    def __truediv__(self, other: ArrayLike) -> Tensor:
+        other = other if isinstance(other, Tensor) else Tensor(other)
+        return self * other**-1
+
+    def __rtruediv__(self, other: ArrayLike) -> Tensor:
+        return self**-1 * other
+
+    def __pow__(self, other: Union[int, float]) -> Tensor:
+        assert isinstance(other, (int, float)), 'Only support int / float powers'
+        p = self.data**other
+        result = Tensor(p, (self, ), f'**{other}')
+        def _backward():
+            self.grad += other * self.data**(other - 1) * result.grad
+        result._backward = _backward
+        return result
+
+    def __repr__(self) -> str:
+        return f"Tensor(shape={self.shape}, data={self.data})"
@@ -0,0 +1,32 @@
+from typing import Union
+import numpy as np
+from tensor import Tensor
+
+class TensorLayer:
+    def __init__(self, nin: int, nout: int) -> None:
+        # column j holds the weights of neuron j, so a batch is a single matmul
+        self.w = Tensor(np.random.uniform(-1, 1, (nin, nout)))
+        self.b = Tensor(np.random.uniform(-1, 1, (nout, )))
+
+    def __call__(self, x: Union[Tensor, np.ndarray]) -> Tensor:
+        x = x if isinstance(x, Tensor) else Tensor(x)
+        return (x @ self.w + self.b).tanh()
+
+    def parameters(self) -> list[Tensor]:
+        return [self.w, self.b]
+
+class TensorMLP:
+    def __init__(self, nin: int, nouts: list[int]) -> None:
+        sz = [nin] + nouts
+        self.layers = [TensorLayer(sz[i], sz[i+1]) for i in range(len(nouts))]
+
+    def __call__(self, x: Union[Tensor, np.ndarray]) -> Tensor:
+        for layer in self.layers:
+            x = layer(x)
+        return x # type: ignore
+
+    def parameters(self) -> list[Tensor]:
+        params: list[Tensor] = []
+        for layer in self.layers:
+            params.extend(layer.parameters())
+        return params
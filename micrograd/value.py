@@ -1,103 +1,304 @@
 from __future__ import annotations
 import math
-from typing import Union
+from functools import lru_cache
+from typing import Any, Iterable, Optional, Protocol, Sequence, TypeVar, Union
+
+# tape currently recording newly created nodes, see Tape
+_active_tape: Optional[Tape] = None
+
+class _Node(Protocol):
+    @property
+    def _prev(self) -> Iterable[Any]: ...
+
+N = TypeVar('N', bound=_Node)
+
+def topological_order(root: N) -> list[N]:
+    # iterative post-order dfs, so deep graphs don't hit the recursion limit.
+    # Works for any node type with _prev, Tensor uses it too
+    topo: list[N] = []
+    visited: set[N] = set()
+    stack: list[tuple[N, bool]] = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            topo.append(node)
+            continue
+        if node in visited:
+            continue
+        visited.add(node)
+        stack.append((node, True))
+        for child in node._prev:
+            if child not in visited:
+                stack.append((child, False))
+    return topo
+
+def run_backward(root: Value, topo: list[Value], release: bool = False) -> None:
+    # an interned constant is shared by every graph, so it never takes a grad
+    if not root._const:
+        root.grad = 1
+    if not release:
+        for node in reversed(topo):
+            node._backward()
+        return
+    # pop nodes as we go and cut their links so each intermediate node can be
+    # freed as soon as its gradient has been pushed to its children
+    while topo:
+        node = topo.pop()
+        node._backward()
+        node._prev = ()
+
+class Tape:
+    def __init__(self) -> None:
+        self.nodes: list[Value] = []
+
+    def __enter__(self) -> Tape:
+        global _active_tape
+        assert _active_tape is None, 'Tapes cannot be nested'
+        self.nodes = []
+        _active_tape = self
+        return self
+
+    def __exit__(self, *args) -> None:
+        global _active_tape
+        _active_tape = None
+
+    def backward(self, root: Value, release: bool = False) -> None:
+        # a node can only be created after its children, so creation order is
+        # already a topological order and no graph search is needed. Nodes
+        # recorded after the root can't feed it and are left out
+        nodes = self.nodes
+        self.nodes = []
+        end = len(nodes)
+        while end > 0 and nodes[end - 1] is not root:
+            end -= 1
+        if end == 0:
+            raise ValueError('root was not recorded on this tape')
+        topo = nodes[:end]
+        # every intermediate node feeding the root has to be on the tape too,
+        # or its backward would never run
+        recorded = set(topo)
+        for node in topo:
+            for child in node._prev:
+                if child._op and child not in recorded:
+                    raise ValueError(
+                        f'a {child._op!r} node used on this tape was created outside it'
+                    )
+        run_backward(root, topo, release=release)
+
+# op codes interpreted by Value._backward
+ADD = '+'
+SUB = '-'
+MUL = '*'
+DIV = '/'
+NEG = 'neg'
+POW = '**'
+TANH = 'tanh'
+EXP = 'exp'
+LINEAR = 'linear'
+LINEAR_TANH = 'linear_tanh'
 
 class Value:
+    # no __dict__ and no per-node closure: the op code plus _arg (the exponent
+    # of a pow, the input data of a linear) is all the backward dispatcher needs
+    __slots__ = ('data', 'grad', '_prev', '_op', '_arg')
+    # constants never accumulate a grad, see Constant
+    _const = False
+
     def __init__(
         self,
         data: float,
         _children: tuple[Value, ...] = (),
-        _op: str = ''
+        _op: str = '',
+        _arg: Any = 0.0
     ) -> None:
         self.data = data
         self.grad = 0.0
-        self._backward = lambda: None
-        self._prev = set(_children)
+        self._prev = _children
         self._op = _op
+        self._arg = _arg
+        if _active_tape is not None:
+            _active_tape.nodes.append(self)
 
-    def backward(self) -> None:
-        topo: list[Value] = []
-        visited: set[Value] = set()
-        def build_topo(value: Value):
-            if value in visited:
-                return
-            visited.add(value)
-            for child in value._prev:
-                build_topo(child)
-            topo.append(value)
-        build_topo(self)
-        self.grad = 1
-        for node in reversed(topo):
-            node._backward()
+    def backward(self, release: bool = False) -> None:
+        run_backward(self, topological_order(self), release=release)
 
     def zero_grad(self) -> None:
-        def step(value: Value) -> None:
-            value.grad = 0
-            for child in value._prev:
-                step(child)
-        step(self)
+        for node in topological_order(self):
+            node.grad = 0
+
+    def _backward(self) -> None:
+        op = self._op
+        if not op:
+            return
+        grad = self.grad
+        if op is ADD:
+            a, b = self._prev
+            if not a._const:
+                a.grad += grad
+            if not b._const:
+                b.grad += grad
+        elif op is SUB:
+            a, b = self._prev
+            if not a._const:
+                a.grad += grad
+            if not b._const:
+                b.grad -= grad
+        elif op is MUL:
+            a, b = self._prev
+            if not a._const:
+                a.grad += b.data * grad
+            if not b._const:
+                b.grad += a.data * grad
+        elif op is DIV:
+            a, b = self._prev
+            if not a._const:
+                a.grad += grad / b.data
+            if not b._const:
+                b.grad -= grad * a.data / b.data**2
+        elif op is NEG:
+            a, = self._prev
+            a.grad -= grad
+        elif op is TANH:
+            a, = self._prev
+            a.grad += (1 - self.data**2) * grad
+        elif op is EXP:
+            a, = self._prev
+            a.grad += self.data * grad
+        elif op is POW:
+            a, = self._prev
+            a.grad += self._arg * a.data**(self._arg - 1) * grad
+        elif op is LINEAR or op is LINEAR_TANH:
+            if op is LINEAR_TANH:
+                grad *= 1 - self.data**2
+            # _prev is (b, *w) followed by *x when the inputs are Values
+            prev = self._prev
+            xs = self._arg
+            n = len(xs)
+            b = prev[0]
+            if not b._const:
+                b.grad += grad
+            for i in range(n):
+                wi = prev[1 + i]
+                if not wi._const:
+                    wi.grad += xs[i] * grad
+            if len(prev) > n + 1:
+                for i in range(n):
+                    xi = prev[1 + n + i]
+                    if not xi._const:
+                        xi.grad += prev[1 + i].data * grad
+
+    # unary ops on a constant and binary ops between two constants fold into a
+    # new constant instead of adding a node
 
     def tanh(self) -> Value:
         e = math.exp(2 * self.data)
         t = (e - 1) / (e + 1)
-        result = Value(t, (self, ), 'tanh')
-        def _backward():
-            self.grad += (1 - t**2) * result.grad
-        result._backward = _backward
-        return result
+        if self._const:
+            return constant(t)
+        return Value(t, (self, ), TANH)
 
     def exp(self) -> Value:
-        e = math.exp(self.data)
-        result = Value(e, (self, ), 'exp')
-        def _backward():
-            self.grad += e * result.grad
-        result._backward = _backward
-        return result
+        if self._const:
+            return constant(math.exp(self.data))
+        return Value(math.exp(self.data), (self, ), EXP)
 
     def __add__(self, other: Union[Value, float]) -> Value:
-        other = other if isinstance(other, Value) else Value(other)
-        result = Value(self.data + other.data, (self, other), '+')
-        def _backward():
-            self.grad += result.grad
-            other.grad += result.grad
-        result._backward = _backward
-        return result
+        other = other if isinstance(other, Value) else constant(other)
+        if self._const and other._const:
+            return constant(self.data + other.data)
+        return Value(self.data + other.data, (self, other), ADD)
 
-    def __radd__(self, other: Union[Value, float]) -> Value:
-        return self + other
+    def __radd__(self, other: float) -> Value:
+        # sum() starts from the int 0, which would otherwise be a dead node
+        if type(other) is int and other == 0:
+            return self
+        return constant(other) + self
 
     def __neg__(self) -> Value:
-        return self * -1
+        if self._const:
+            return constant(-self.data)
+        return Value(-self.data, (self, ), NEG)
 
     def __sub__(self, other: Union[Value, float]) -> Value:
-        return self + -other
+        other = other if isinstance(other, Value) else constant(other)
+        if self._const and other._const:
+            return constant(self.data - other.data)
+        return Value(self.data - other.data, (self, other), SUB)
 
-    def __rsub__(self, other: Union[Value, float]) -> Value:
-        return -self + other
+    def __rsub__(self, other: float) -> Value:
+        return constant(other) - self
 
     def __mul__(self, other: Union[Value, float]) -> Value:
-        other = other if isinstance(other, Value) else Value(other)
-        result = Value(self.data * other.data, (self, other), '*')
-        def _backward():
-            self.grad += other.data * result.grad
-            other.grad += self.data * result.grad
-        result._backward = _backward
-        return result
+        other = other if isinstance(other, Value) else constant(other)
+        if self._const and other._const:
+            return constant(self.data * other.data)
+        return Value(self.data * other.data, (self, other), MUL)
 
-    def __rmul__(self, other: Union[Value, float]) -> Value:
-        return self * other
+    def __rmul__(self, other: float) -> Value:
+        return constant(other) * self
 
     def __truediv__(self, other: Union[Value, float]) -> Value:
-        return self * other**-1
+        other = other if isinstance(other, Value) else constant(other)
+        if self._const and other._const:
+            return constant(self.data / other.data)
+        return Value(self.data / other.data, (self, other), DIV)
+
+    def __rtruediv__(self, other: float) -> Value:
+        return constant(other) / self
 
     def __pow__(self, other: Union[int, float]) -> Value:
         assert isinstance(other, (int, float)), 'Only support int / float powers'
-        p = self.data**other
-        result = Value(p, (self, ), f'**{other}')
-        def _backward():
-            self.grad += other * self.data**(other - 1) * result.grad
-        result._backward = _backward
-        return result
+        if self._const:
+            return constant(self.data**other)
+        return Value(self.data**other, (self, ), POW, other)
 
     def __repr__(self) -> str:
         return f"Value(data={self.data})"
+
+class Constant(Value):
+    # a leaf that never needs a grad. Constants are interned, so one instance
+    # is shared by every graph using that number, and aren't put on tapes
+    __slots__ = ()
+    _const = True
+
+    def __init__(self, data: float) -> None:
+        self.data = data
+        self.grad = 0.0
+        self._prev = ()
+        self._op = ''
+        self._arg = 0.0
+
+    def __repr__(self) -> str:
+        return f"Constant(data={self.data})"
+
+def constant(data: float) -> Constant:
+    # -0.0 == 0.0 and True == 1 but they don't behave the same, so the type
+    # and sign are part of the key
+    return _interned(type(data), data, math.copysign(1.0, data))
+
+@lru_cache(maxsize=1024)
+def _interned(kind: type, data: float, sign: float) -> Constant:
+    return Constant(data)
+
+def linear(w: Sequence[Value], x: Sequence[Union[Value, float]], b: Value) -> Value:
+    # b + sum(w * x) as a single node instead of a chain of 2 * len(w) nodes
+    return _linear(w, x, b, LINEAR)
+
+def linear_tanh(w: Sequence[Value], x: Sequence[Union[Value, float]], b: Value) -> Value:
+    return _linear(w, x, b, LINEAR_TANH)
+
+def _linear(w: Sequence[Value], x: Sequence[Union[Value, float]], b: Value, op: str) -> Value:
+    assert len(w) == len(x)
+    xs = tuple(xi.data if isinstance(xi, Value) else float(xi) for xi in x)
+    if any(isinstance(xi, Value) for xi in x):
+        xv = [xi if isinstance(xi, Value) else constant(xi) for xi in x]
+        children = (b, *w, *xv)
+    else:
+        # plain float inputs never need a grad, so they are kept off the graph
+        children = (b, *w)
+    act = b.data
+    for wi, xi in zip(w, xs):
+        act += wi.data * xi
+    if op is LINEAR_TANH:
+        act = math.tanh(act)
+    return Value(act, children, op, xs)
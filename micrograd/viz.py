@@ -1,17 +1,19 @@
+from typing import Optional, Union
 from graphviz import Digraph
-from value import Value
+from nn import MLP, Layer, Neuron
+from value import POW, Value
 
 def trace_computation_graph(root: Value):
-    nodes: set[Value] = set()
+    nodes: set[Value] = {root}
     edges: set[tuple[Value, Value]] = set()
-    def build(value: Value):
-        if value in nodes:
-            return
-        nodes.add(value)
+    stack = [root]
+    while stack:
+        value = stack.pop()
         for child in value._prev:
             edges.add((child, value))
-            build(child)
-    build(root)
+            if child not in nodes:
+                nodes.add(child)
+                stack.append(child)
     return nodes, edges
 
 def draw_computation_graph(root: Value):
@@ -29,11 +31,100 @@ def draw_computation_graph(root: Value):
         )
         if node._op:
             op_id = node_id + node._op
-            dot.node(name=op_id, label=node._op)
+            dot.node(name=op_id, label=_op_label(node))
             dot.edge(op_id, node_id)
     for node_a, node_b in edges:
         node_a_id = str(id(node_a))
         node_b_op_id = str(id(node_b)) + node_b._op
         dot.edge(node_a_id, node_b_op_id)
 
-    return dot
\ No newline at end of file
+    return dot
+
+def write_computation_graph(
+    root: Value,
+    path: str,
+    module: Optional[Union[MLP, Layer, Neuron]] = None,
+    max_nodes: int = 200
+) -> int:
+    # DOT for graphs far too big to draw node by node. With a module, each
+    # neuron's parameters collapse into one node and every application of the
+    # neuron (one per sample) into another. If there are more neuron groups
+    # than max_nodes, whole layers collapse instead. Past that the remaining
+    # nodes collapse by op, and the overflow is lumped into a single node.
+    # Returns the number of nodes drawn
+    nodes, edges = trace_computation_graph(root)
+
+    def grouped_keys(groups: dict[Value, str]) -> dict[Value, str]:
+        keys: dict[Value, str] = {}
+        for node in nodes:
+            if node in groups:
+                keys[node] = f'{groups[node]} params'
+                continue
+            for child in node._prev:
+                if child in groups:
+                    keys[node] = groups[child]
+                    break
+        return keys
+
+    keys: dict[Value, str] = {}
+    if module is not None:
+        keys = grouped_keys(_module_groups(module))
+        if len(set(keys.values())) > max_nodes:
+            keys = grouped_keys(_module_groups(module, by_layer=True))
+    ungrouped = [node for node in nodes if node not in keys]
+    n_groups = len(set(keys.values()))
+    for node in ungrouped:
+        if n_groups + len(ungrouped) > max_nodes:
+            keys[node] = _op_label(node) if node._op else 'leaf'
+        else:
+            keys[node] = f'#{id(node)}'
+
+    counts: dict[str, int] = {}
+    for key in keys.values():
+        counts[key] = counts.get(key, 0) + 1
+    if len(counts) > max_nodes:
+        kept = set(sorted(counts, key=lambda k: -counts[k])[:max_nodes - 1])
+        for node, key in keys.items():
+            if key not in kept:
+                keys[node] = 'other'
+        counts = {}
+        for key in keys.values():
+            counts[key] = counts.get(key, 0) + 1
+
+    edge_counts: dict[tuple[str, str], int] = {}
+    for a, b in edges:
+        edge = (keys[a], keys[b])
+        if edge[0] != edge[1]:
+            edge_counts[edge] = edge_counts.get(edge, 0) + 1
+
+    ids = { key: f'n{i}' for i, key in enumerate(counts) }
+    representative = { key: node for node, key in keys.items() }
+    with open(path, 'w') as f:
+        f.write('digraph {\n\trankdir=LR\n\tnode [shape=record]\n')
+        for key, count in counts.items():
+            if key.startswith('#'):
+                node = representative[key]
+                label = '{ %s | data %.4f | grad %.4f }' % (_op_label(node) or 'leaf', node.data, node.grad)
+            else:
+                label = '{ %s | x%d }' % (key, count)
+            f.write(f'\t{ids[key]} [label="{label}"]\n')
+        for (a, b), count in edge_counts.items():
+            attrs = f' [label="x{count}"]' if count > 1 else ''
+            f.write(f'\t{ids[a]} -> {ids[b]}{attrs}\n')
+        f.write('}\n')
+    return len(counts)
+
+def _op_label(node: Value) -> str:
+    return f'**{node._arg}' if node._op == POW else node._op
+
+def _module_groups(module: Union[MLP, Layer, Neuron], by_layer: bool = False) -> dict[Value, str]:
+    # group label of every parameter, per neuron (L0.N3) or per layer (L0)
+    if isinstance(module, Neuron):
+        return { p: 'N0' for p in module.parameters() }
+    layers = module.layers if isinstance(module, MLP) else [module]
+    groups: dict[Value, str] = {}
+    for i, layer in enumerate(layers):
+        for j, neuron in enumerate(layer.neurons):
+            for p in neuron.parameters():
+                groups[p] = f'L{i}' if by_layer else f'L{i}.N{j}'
+    return groups